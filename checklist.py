@@ -102,11 +102,16 @@ class CheckBoxGroup(QWidget):
 		self.updateitems = items
 
 	def changed(self):
-		if self.updateitems is not None:
-			self.dirtied()
-			self.updateitems.clear()
-			for x in self.checked_items():
-				self.updateitems.add(x)
+		if self.updateitems is None:
+			return
+		# moving the current item is not a change
+		checked = set(self.checked_items())
+		if checked == set(self.updateitems):
+			return
+		self.updateitems.clear()
+		for x in checked:
+			self.updateitems.add(x)
+		self.dirtied()
 
 	def checked_items(self):
 		return [
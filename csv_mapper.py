@@ -15,10 +15,14 @@ Features:
 """
 
 import csv
+import io
+import mmap
+from array import array
 from dataclasses import fields, is_dataclass
 from datetime import datetime, date, time
-from typing import get_origin, get_args, Union, List, Tuple, Type, Set
+from typing import get_origin, get_args, Union, List, Tuple, Type, Set, Iterator, Iterable
 from enum import Enum
+from operator import attrgetter
 
 SET_SEPARATOR = ";"
 
@@ -60,28 +64,100 @@ _DATE_FORMATS = (
 	"%m/%d/%Y",
 )
 
+# formats that may be tried first for a column once they worked:
+# a date valid as %m/%d/%Y may also be valid (and differ) as %d/%m/%Y.
+_DATE_FIRST_OK = _DATE_FORMATS[:2]
+
 _TIME_FORMATS = (
 	"%H:%M:%S",
 	"%H:%M",
 )
 
+# distinct values remembered per column by date/time parsers
+PARSE_MEMO = 4096
 
-def parse_date(value: str) -> date:
-	for fmt in _DATE_FORMATS:
+
+def strptime_first(value: str, formats) -> tuple[datetime|None, str|None]:
+	for fmt in formats:
 		try:
-			return datetime.strptime(value, fmt).date()
+			return datetime.strptime(value, fmt), fmt
 		except ValueError:
 			pass
-	raise ValueError(f"Invalid date format: '{value}'")
+	return None, None
 
 
-def parse_time(value: str) -> time:
-	for fmt in _TIME_FORMATS:
+def fast_date(value: str) -> date|None:
+	"""YYYY-MM-DD without going through strptime"""
+	if len(value) == 10 and value[4] == "-" and value[7] == "-":
 		try:
-			return datetime.strptime(value, fmt).time()
+			return date.fromisoformat(value)
 		except ValueError:
 			pass
-	raise ValueError(f"Invalid time format: '{value}'")
+	return None
+
+
+def fast_time(value: str) -> time|None:
+	"""HH:MM or HH:MM:SS without going through strptime"""
+	if (len(value) == 5 or len(value) == 8) and value[2] == ":" and value[0].isdigit():
+		try:
+			return time.fromisoformat(value)
+		except ValueError:
+			pass
+	return None
+
+
+def parse_date(value: str) -> date:
+	d = fast_date(value)
+	if d is not None:
+		return d
+	dt, _ = strptime_first(value, _DATE_FORMATS)
+	if dt is None:
+		raise ValueError(f"Invalid date format: '{value}'")
+	return dt.date()
+
+
+def parse_time(value: str) -> time:
+	t = fast_time(value)
+	if t is not None:
+		return t
+	dt, _ = strptime_first(value, _TIME_FORMATS)
+	if dt is None:
+		raise ValueError(f"Invalid time format: '{value}'")
+	return dt.time()
+
+
+def column_parser(fast, formats, firstok, what):
+	"""
+	parser for a column of dates or times. It remembers the values
+	already seen and tries first the format that worked last.
+	"""
+	seen = {}
+	order = [formats]
+	def parse(value: str):
+		v = seen.get(value)
+		if v is not None:
+			return v
+		v = fast(value)
+		if v is None:
+			dt, fmt = strptime_first(value, order[0])
+			if dt is None:
+				raise ValueError(f"Invalid {what} format: '{value}'")
+			v = dt.date() if what == "date" else dt.time()
+			if fmt in firstok and fmt != order[0][0]:
+				order[0] = (fmt,) + tuple(f for f in formats if f != fmt)
+		if len(seen) >= PARSE_MEMO:
+			seen.clear()
+		seen[value] = v
+		return v
+	return parse
+
+
+def date_parser():
+	return column_parser(fast_date, _DATE_FORMATS, _DATE_FIRST_OK, "date")
+
+
+def time_parser():
+	return column_parser(fast_time, _TIME_FORMATS, _TIME_FORMATS, "time")
 
 
 def parse_string_set(value: str) -> Set[str]:
@@ -94,55 +170,279 @@ def parse_string_list(value: str) -> List[str]:
 		return list()
 	return [v.strip() for v in value.split(SET_SEPARATOR) if v.strip()]
 
-def convert_value(value: str, target_type):
-	if value == "" or value is None:
-		return None
+def parse_bool(value: str) -> bool:
+	v = value.strip().lower()
+	if v in ("true", "1", "yes", "y", "t"):
+		return True
+	if v in ("false", "0", "no", "n", "f"):
+		return False
+	raise ValueError(f"Invalid boolean: '{value}'")
 
-	# ---- bool ----
-	if target_type is bool:
-		v = value.strip().lower()
-		if v in ("true", "1", "yes", "y", "t"):
-			return True
-		if v in ("false", "0", "no", "n", "f"):
-			return False
-		raise ValueError(f"Invalid boolean: '{value}'")
-
-	# ---- enum ----
-	if isinstance(target_type, type) and issubclass(target_type, Enum):
+def parse_float(value: str) -> float:
+	return float(value.replace("€",""))
+
+def parse_str(value: str) -> str:
+	return value
+
+def enum_parser(target_type):
+	members = target_type.__members__
+	def parse_enum(value: str):
 		try:
-			if value in target_type.__members__:
+			if value in members:
 				return target_type[value]
 			return target_type(value)
 		except Exception:
 			valid = ", ".join(e.name for e in target_type)
 			raise ValueError(f"Invalid enum value '{value}'. Valid: {valid}")
+	return parse_enum
 
-	# ---- set[str] ----
-	if is_string_set(target_type):
-		return parse_string_set(value)
-	# ---- list[str] ----
-	if is_string_list(target_type):
-		return parse_string_list(value)
-
-	# ---- primitives ----
-	if target_type is int:
-		return int(value)
-	if target_type is float:
-		return float(value.replace("€",""))
-	if target_type is str:
-		return value
-	if target_type is date:
-		return parse_date(value)
-	if target_type is time:
-		return parse_time(value)
+def unsupported_parser(target_type):
+	def parse_unsupported(value: str):
+		raise TypeError(f"Unsupported type: {target_type}")
+	return parse_unsupported
+
+_converters = {}
+
+def converter_for(target_type):
+	"""function converting a non empty string to target_type"""
+	conv = _converters.get(target_type)
+	if conv is not None:
+		return conv
+	if target_type is bool:
+		conv = parse_bool
+	elif isinstance(target_type, type) and issubclass(target_type, Enum):
+		conv = enum_parser(target_type)
+	elif is_string_set(target_type):
+		conv = parse_string_set
+	elif is_string_list(target_type):
+		conv = parse_string_list
+	elif target_type is int:
+		conv = int
+	elif target_type is float:
+		conv = parse_float
+	elif target_type is str:
+		conv = parse_str
+	elif target_type is date:
+		conv = parse_date
+	elif target_type is time:
+		conv = parse_time
+	else:
+		conv = unsupported_parser(target_type)
+	_converters[target_type] = conv
+	return conv
 
-	raise TypeError(f"Unsupported type: {target_type}")
+def convert_value(value: str, target_type):
+	if value == "" or value is None:
+		return None
+	return converter_for(target_type)(value)
 
 
 # =========================
 # CSV → Objects
 # =========================
 
+_decoders = {}
+
+def compile_decoder(cls: Type, header: list[str], renames: dict[str,str] = None):
+	"""
+	Returns a function decoding a row (list of strings) for the header
+	into (kwargs, errors). Column lookups and converters are resolved
+	once per (class, header, renames).
+	"""
+	key = (cls, tuple(header), tuple(sorted(renames.items())) if renames else None)
+	decode = _decoders.get(key)
+	if decode is not None:
+		return decode
+
+	pos = {}
+	for i, h in enumerate(header):
+		pos[h] = i
+	plan = []
+	for name, field_type in get_field_types(cls).items():
+		cols = tuple(pos[n] for n in (name, name.upper()) if n in pos)
+		alts = ()
+		if renames is not None and name in renames:
+			v = renames[name]
+			alts = tuple(pos[n] for n in (v, v.upper()) if n in pos)
+		optional = is_optional(field_type)
+		if optional:
+			field_type = unwrap_optional(field_type)
+		if field_type is date:
+			conv = date_parser()
+		elif field_type is time:
+			conv = time_parser()
+		else:
+			conv = converter_for(field_type)
+		plan.append((name, cols, alts, conv, optional))
+
+	def decode(row: list[str]) -> tuple[dict, list[str]]:
+		n = len(row)
+		kwargs = {}
+		row_errors = []
+		for name, cols, alts, conv, optional in plan:
+			raw = ""
+			for i in cols:
+				if i < n and row[i]:
+					raw = row[i].strip()
+					break
+			if raw == "":
+				for i in alts:
+					if i < n and row[i]:
+						raw = row[i].strip()
+						break
+			if raw == "":
+				if optional:
+					kwargs[name] = None
+				else:
+					row_errors.append(f"{name}: Required value missing")
+				continue
+			try:
+				kwargs[name] = conv(raw)
+			except Exception as e:
+				row_errors.append(f"{name}: {e}")
+		return kwargs, row_errors
+
+	_decoders[key] = decode
+	return decode
+
+
+def row_dict(header: list[str], row: list[str]) -> dict:
+	"""the row as csv.DictReader would return it"""
+	d = dict(zip(header, row))
+	if len(row) > len(header):
+		d[None] = row[len(header):]
+	for k in header[len(row):]:
+		d[k] = None
+	return d
+
+
+def recordoffsets(data: bytes, start: int = 0) -> array:
+	"""
+	offsets where records start in data[start:], blank lines skipped;
+	a newline within a quoted field does not end a record.
+	"""
+	offs = array("q")
+	n = len(data)
+	find = data.find
+	p = start
+	while p < n:
+		q = find(b"\n", p)
+		# mmap has no count()
+		while q >= 0 and data[p:q].count(b'"') % 2 != 0:
+			q = find(b"\n", q+1)
+		if q < 0:
+			q = n
+		if q - p > 1 or (q - p == 1 and data[p] != 13):
+			offs.append(p)
+		p = q + 1
+	return offs
+
+
+class MappedCsv:
+	"""
+	objects in a CSV file, decoded only when asked for.
+	The file is mapped in memory and indexed by record offsets;
+	it is a read only sequence of objects.
+	"""
+	def __init__(self, csv_path: str, cls: Type, renames: dict[str,str] = None, cached: int = PARSE_MEMO):
+		self.path = csv_path
+		self.cls = cls
+		self.f = open(csv_path, "rb")
+		try:
+			self.data = mmap.mmap(self.f.fileno(), 0, access=mmap.ACCESS_READ)
+		except ValueError:
+			# empty file
+			self.data = b""
+		offs = recordoffsets(self.data)
+		self.header = []
+		if len(offs) > 0:
+			end = offs[1] if len(offs) > 1 else len(self.data)
+			self.header = self.record(offs[0], end)
+		self.offsets = offs[1:]
+		self.offsets.append(len(self.data))
+		self.decode = compile_decoder(cls, self.header, renames)
+		self.cache = {}
+		self.cached = cached
+
+	def close(self) -> None:
+		if isinstance(self.data, mmap.mmap):
+			self.data.close()
+		self.f.close()
+
+	def record(self, start: int, end: int) -> list[str]:
+		text = self.data[start:end].decode("utf-8")
+		return next(csv.reader(io.StringIO(text, newline=""), delimiter=CSV_SEP), [])
+
+	def __len__(self) -> int:
+		return len(self.offsets) - 1
+
+	def get(self, i: int) -> Tuple[object, dict]:
+		"""(object, None) or (None, error) for record i, as iter_objects_from_csv"""
+		row = self.record(self.offsets[i], self.offsets[i+1])
+		kwargs, row_errors = self.decode(row)
+		if row_errors:
+			return None, {
+				"row": i + 2,
+				"errors": row_errors,
+				"data": row_dict(self.header, row)
+			}
+		return self.cls(**kwargs), None
+
+	def obj(self, i: int) -> object:
+		"""object for record i, raising ValueError for bad records"""
+		o, e = self.get(i)
+		if e is not None:
+			raise ValueError(f"{self.path}:{e['row']}: {'; '.join(e['errors'])}")
+		return o
+
+	def __getitem__(self, i):
+		if isinstance(i, slice):
+			return [self[k] for k in range(*i.indices(len(self)))]
+		if i < 0:
+			i += len(self)
+		if i < 0 or i >= len(self):
+			raise IndexError(i)
+		o = self.cache.get(i)
+		if o is None:
+			if len(self.cache) >= self.cached:
+				# forget the oldest one
+				del self.cache[next(iter(self.cache))]
+			o = self.cache[i] = self.obj(i)
+		return o
+
+
+def iter_objects_from_csv(
+	csv_path: str,
+	cls: Type,
+	renames: dict[str,str] = None
+) -> Iterator[Tuple[object, dict]]:
+	"""
+	Yields (object, None) or (None, error) as rows are decoded,
+	the error being as in load_objects_from_csv.
+	"""
+	with open(csv_path, newline="", encoding="utf-8") as f:
+		reader = csv.reader(f, delimiter=CSV_SEP)
+		header = next(reader, None)
+		if header is None:
+			return
+		decode = compile_decoder(cls, header, renames)
+
+		row_num = 1
+		for row in reader:
+			if not row:
+				continue
+			row_num += 1
+			kwargs, row_errors = decode(row)
+			if row_errors:
+				yield None, {
+					"row": row_num,
+					"errors": row_errors,
+					"data": row_dict(header, row)
+				}
+			else:
+				yield cls(**kwargs), None
+
+
 def load_objects_from_csv(
 	csv_path: str,
 	cls: Type,
@@ -161,42 +461,11 @@ def load_objects_from_csv(
 	"""
 	objects = []
 	errors = []
-
-	field_types = get_field_types(cls)
-
-	with open(csv_path, newline="", encoding="utf-8") as f:
-		reader = csv.DictReader(f, delimiter=CSV_SEP)
-
-		for row_num, row in enumerate(reader, start=2):
-			kwargs = {}
-			row_errors = []
-
-			for name, field_type in field_types.items():
-				raw = (row.get(name) or row.get(name.upper()) or "").strip()
-				if raw == "":
-					if renames is not None and name in renames:
-						v = renames[name]
-						raw = (row.get(v) or row.get(v.upper()) or "").strip()
-				try:
-					if is_optional(field_type):
-						inner = unwrap_optional(field_type)
-						kwargs[name] = None if raw == "" else convert_value(raw, inner)
-					else:
-						if raw == "":
-							raise ValueError("Required value missing")
-						kwargs[name] = convert_value(raw, field_type)
-				except Exception as e:
-					row_errors.append(f"{name}: {e}")
-
-			if row_errors:
-				errors.append({
-					"row": row_num,
-					"errors": row_errors,
-					"data": row
-				})
-			else:
-				objects.append(cls(**kwargs))
-
+	for o, e in iter_objects_from_csv(csv_path, cls, renames):
+		if e is None:
+			objects.append(o)
+		else:
+			errors.append(e)
 	return objects, errors
 
 
@@ -220,7 +489,7 @@ def format_value(value) -> str:
 	if isinstance(value, time):
 		return value.strftime("%H:%M")
 
-	if isinstance(value, set):
+	if isinstance(value, (set, frozenset)):
 		return SET_SEPARATOR.join(sorted(value))
 
 	if isinstance(value, list):
@@ -229,38 +498,139 @@ def format_value(value) -> str:
 	return str(value)
 
 
+def csv_fields(cls: Type, skip: set[str] = None) -> list[str]:
+	"""fields of cls written to csv files"""
+	if skip is None:
+		skip = set([])
+	return [x for x in get_field_types(cls).keys() if not x in skip]
+
+
+def csv_header(field_names: list[str], renames: dict[str,str] = None) -> list[str]:
+	if renames is None:
+		return [f.upper() for f in field_names]
+	return [renames.get(n, n).upper() for n in field_names]
+
+
+def format_bool(value) -> str:
+	if type(value) is bool:
+		return "true" if value else "false"
+	return format_value(value)
+
+
+def format_date(value) -> str:
+	if type(value) is date:
+		return value.isoformat()
+	return format_value(value)
+
+
+def format_time(value) -> str:
+	if type(value) is time and value.tzinfo is None:
+		# same as strftime("%H:%M"), but faster
+		return value.isoformat("minutes")
+	return format_value(value)
+
+
+def format_number(value) -> str:
+	t = type(value)
+	if t is float or t is int:
+		return str(value)
+	return format_value(value)
+
+
+def format_str(value) -> str:
+	if type(value) is str:
+		return value
+	return format_value(value)
+
+
+def enum_formatter(target_type):
+	names = {m: m.name for m in target_type}
+	def fmt(value) -> str:
+		if type(value) is target_type:
+			return names[value]
+		return format_value(value)
+	return fmt
+
+
+def strings_formatter():
+	"""format_value for sets and lists of strings; frozen sets are
+	often shared by many objects and are joined only once.
+	"""
+	joined = {}
+	def fmt(value) -> str:
+		if type(value) is frozenset:
+			s = joined.get(value)
+			if s is None:
+				s = joined[value] = SET_SEPARATOR.join(sorted(value))
+			return s
+		return format_value(value)
+	return fmt
+
+
+def formatter_for(field_type):
+	"""
+	function formatting values of field_type as format_value does.
+	It takes a fast path for values of the expected type and uses
+	format_value for any other.
+	"""
+	if is_optional(field_type):
+		field_type = unwrap_optional(field_type)
+	if field_type is bool:
+		return format_bool
+	if isinstance(field_type, type) and issubclass(field_type, Enum):
+		return enum_formatter(field_type)
+	if field_type is date:
+		return format_date
+	if field_type is time:
+		return format_time
+	if field_type is int or field_type is float:
+		return format_number
+	if field_type is str:
+		return format_str
+	if is_string_set(field_type) or is_string_list(field_type):
+		return strings_formatter()
+	return format_value
+
+
+def compile_encoder(cls: Type, field_names: list[str]):
+	"""
+	Returns a function making the row (list of strings) for an
+	object, as csv_row does, with formatters resolved once.
+	"""
+	types = get_field_types(cls)
+	fmts = [formatter_for(types[n]) for n in field_names]
+	if not field_names:
+		return lambda obj: []
+	get = attrgetter(*field_names)
+	if len(field_names) == 1:
+		fmt = fmts[0]
+		return lambda obj: [fmt(get(obj))]
+
+	def encode(obj) -> list[str]:
+		return [f(v) for f, v in zip(fmts, get(obj))]
+	return encode
+
+
+def csv_row(obj, field_names: list[str]) -> list[str]:
+	return [format_value(getattr(obj, name)) for name in field_names]
+
+
 def write_objects_to_csv(
 	csv_path: str,
-	objects: List[object],
+	objects: Iterable[object],
 	cls: Type,
 	renames: dict[str,str] = None,
 	skip: set[str] = None
 ):
-	if skip is None:
-		skip = set([])
-	field_names = list(get_field_types(cls).keys())
-	r = [x for x in field_names if not x in skip]
-	field_names = r
+	"""write objects, any iterable of them, with a header row"""
+	field_names = csv_fields(cls, skip)
+	encode = compile_encoder(cls, field_names)
 
 	with open(csv_path, "w", newline="", encoding="utf-8") as f:
-		hdrnames = [f.upper() for f in field_names]
-		if renames is not None:
-			hdrnames = [name for name in field_names]
-			for i, n in enumerate(hdrnames):
-				if n in renames:
-					hdrnames[i] = renames[n]
-				hdrnames[i] = hdrnames[i].upper()
-
-		writer = csv.DictWriter(f, fieldnames=hdrnames, delimiter=CSV_SEP)
-		writer.writeheader()
-		if not objects:
-			return
-		writer = csv.DictWriter(f, fieldnames=field_names,
+		hdr = csv.writer(f, delimiter=CSV_SEP)
+		hdr.writerow(csv_header(field_names, renames))
+		writer = csv.writer(f,
 			quotechar='"',
 			quoting = csv.QUOTE_ALL,
 			delimiter=CSV_SEP)
-		for obj in objects:
-			writer.writerow({
-				name: format_value(getattr(obj, name))
-				for name in field_names
-			})
+		writer.writerows(map(encode, objects))
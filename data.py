@@ -1,14 +1,37 @@
 #
 # data classes
 #
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
 from datetime import date, time, datetime
 from typing import Optional, Set, List
 from enum import Enum, IntEnum
+from array import array
+from bisect import bisect_left, bisect_right
 import os
 import sys
 import shutil
-from csv_mapper import load_objects_from_csv,write_objects_to_csv
+import csv
+import difflib
+import hashlib
+import pickle
+import re
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from time import perf_counter
+try:
+	import fcntl
+except ImportError:
+	fcntl = None
+try:
+	import numpy as np
+except ImportError:
+	np = None
+from csv_mapper import load_objects_from_csv,iter_objects_from_csv,write_objects_to_csv
+from csv_mapper import CSV_SEP,compile_decoder,row_dict,csv_fields,csv_header,csv_row
+from csv_mapper import MappedCsv
+from sql_mapper import load_objects_from_sql,write_objects_to_sql,link_table
 
 from newdata import *
 
@@ -18,7 +41,34 @@ TRADESFILE = "trades.csv"
 CURRENCIESFILE = "divisas.csv"
 FEATURESFILE = "features.csv"
 INSTRUMENTSFILE = "activos.csv"
+# trade changes not yet saved in TRADESFILE
+JOURNALFILE = "trades.journal"
+# decoded tables, to skip parsing them when they did not change
+SNAPSHOTFILE = "roadbook.snapshot"
+SNAPVERSION = 2
+# roadbook kept in sqlite instead of CSV files, see RoadBook.tosql()
+SQLFILE = "roadbook.sqlite"
+# tables as saved, in order
+TABLES = (ACCOUNTFILE, CURRENCIESFILE, INSTRUMENTSFILE, SETUPSFILE, FEATURESFILE, TRADESFILE)
+# RoadBook list and key field for the tables, see reloadtable()
+TABLEROWS = {
+	CURRENCIESFILE: ("currencies", "name"),
+	INSTRUMENTSFILE: ("instruments", "instrument"),
+	SETUPSFILE: ("setups", "setup"),
+	FEATURESFILE: ("features", "feature"),
+	TRADESFILE: ("trades", "trade"),
+}
 GRAPHSDIR = "diarygraphs"
+# trades kept in a file per year instead of TRADESFILE, see usepartitions()
+PARTFILE = "trades-{}.csv"
+PARTRE = re.compile(r"trades-(\d{4})\.csv$")
+# threads copying graphs, see GraphCopier
+GRAPHWORKERS = 4
+# ioctl to clone a file (copy on write) in linux
+FICLONE = 0x40049409
+# trades.csv columns
+TRADERENAMES = {"datein":"date", "has":"with"}
+TRADESKIPS = {"pts"}
 VERSION = 2.0
 BCK = "~"
 
@@ -134,8 +184,25 @@ class Trade1:
 			return self.ptsout - self.ptsin
 		return self.ptsin - self.ptsout
 
-@dataclass
-class Trade:
+# feature sets shared by trades with the same features
+featuresets = {}
+
+def internset(names) -> frozenset[str]:
+	"""shared frozen set of interned names"""
+	if names is None:
+		names = ()
+	fs = frozenset(sys.intern(n) for n in names)
+	return featuresets.setdefault(fs, fs)
+
+def internstr(s: str|None) -> str|None:
+	return sys.intern(s) if s else s
+
+class TradeRefs:
+	"""slots for attributes of a Trade that are not data fields"""
+	__slots__ = ("rb", "memo")
+
+@dataclass(slots=True)
+class Trade(TradeRefs):
 	trade: int = 0
 	instrument: str = ""
 	setup: Optional[str] = None
@@ -211,11 +278,31 @@ class Trade:
 		self.graf = o.graf
 		self.notes = o.notes
 		self.has = o.has
+		self.inval()
 
-	def __postinit__(self):
+	def __post_init__(self):
 		self.rb = None
+		self.memo = None
+		self.compact()
+
+	def compact(self) -> None:
+		"""share strings and feature sets with other trades"""
+		self.instrument = internstr(self.instrument)
+		self.setup = internstr(self.setup)
+		if type(self.has) is not frozenset or featuresets.get(self.has) is not self.has:
+			self.has = internset(self.has)
+		if self.graf is not None and len(self.graf) == 0:
+			self.graf = None
+
 	def inval(self)-> None:
-		pass
+		"""forget derived values, to be called when the trade changes"""
+		self.memo = None
+
+	def memoized(self) -> dict:
+		"""derived values for the trade, dropped by inval() or rb.inval()"""
+		if self.memo is None:
+			self.memo = {}
+		return self.memo
 
 	def setdefaults(self):
 		if self.lots == 0 or self.lots is None:
@@ -224,8 +311,10 @@ class Trade:
 			self.euros = self.lots * self.out
 		if self.instrument == "":
 			self.instrument = "DAX"
-		if len(self.graf) > 1:
+		if self.graf and len(self.graf) > 1:
 			self.graf = canonlist(self.graf)
+		self.compact()
+		self.inval()
 	def hour(self) -> int:
 		return self.timein.hour if self.timein else 0
 
@@ -235,22 +324,31 @@ class Trade:
 		return self.datein.month
 	def day(self) -> int:
 		return self.datein.day
+	def isocal(self) -> tuple[int, int, int]:
+		m = self.memoized()
+		if "isocal" not in m:
+			m["isocal"] = tuple(self.datein.isocalendar())
+		return m["isocal"]
 	def week(self) -> int:
-		dt = datetime(self.datein.year, self.datein.month, self.datein.day)
-		ic = dt.isocalendar()
-		return ic[1]
+		return self.isocal()[1]
 	def dayofweek(self) -> WDay:
-		dt = datetime(self.datein.year, self.datein.month, self.datein.day)
-		ic = dt.isocalendar()
-		return WDay(ic.weekday-1)
+		return WDay(self.isocal()[2]-1)
 	def points(self) -> float:
 		return self.out
 	def stoppoints(self) -> float:
 		return self.stop
 
 	def result(self, neutral: float = 0) -> Result:
-		if neutral == 0 and self.rb and self.rb.account:
-			neutral = self.rb.account.neutral
+		if neutral != 0:
+			return self.mkresult(neutral)
+		m = self.memoized()
+		if "result" not in m:
+			if self.rb and self.rb.account:
+				neutral = self.rb.account.neutral
+			m["result"] = self.mkresult(neutral)
+		return m["result"]
+
+	def mkresult(self, neutral: float) -> Result:
 		pt = self.euros if self.euros != 0 else self.points()
 		if pt > neutral:
 			return Result.OK
@@ -268,12 +366,21 @@ class Trade:
 			return None
 		if self.rb is None:
 			raise "roadbook not set in trade"
-		return self.rb.findInstrument(self.instrument)
+		m = self.memoized()
+		if "instr" not in m:
+			m["instr"] = self.rb.findInstrument(self.instrument)
+		return m["instr"]
 
 	def ptsnorm(self, pts = None) -> float:
 		"""points normalized by scale"""
-		if pts is None:
-			pts = self.points()
+		if pts is not None:
+			return self.mkptsnorm(pts)
+		m = self.memoized()
+		if "ptsnorm" not in m:
+			m["ptsnorm"] = self.mkptsnorm(self.points())
+		return m["ptsnorm"]
+
+	def mkptsnorm(self, pts) -> float:
 		i = self.instr()
 		if i is None:
 			return pts
@@ -285,13 +392,22 @@ class Trade:
 		i = self.instr()
 		if i is None:
 			return None
-		return self.rb.findCurrency(i.currency)
+		m = self.memoized()
+		if "currency" not in m:
+			m["currency"] = self.rb.findCurrency(i.currency)
+		return m["currency"]
 
 	def ptseuros(self, pts = None) -> float:
 		if self.euros != 0:
 			return self.euros
-		if pts is None:
-			pts = self.points()
+		if pts is not None:
+			return self.mkptseuros(pts)
+		m = self.memoized()
+		if "euros" not in m:
+			m["euros"] = self.mkptseuros(self.points())
+		return m["euros"]
+
+	def mkptseuros(self, pts) -> float:
 		toeur = 1.0
 		if self.currency == "EUR" or self.currency == "EURO":
 			return pts * self.lots * toeur
@@ -327,12 +443,701 @@ def tradeexample():
 		"/path/to/plot", "apoyo 4H, sin muros, fuerza, sem flojo. 1H sin fuerza: no reentrar",
 		{"Apertura","Apoyo D","Apoyo4H","Desp.Corr","Pullback", "Sin Muros;Willy OK"})
 
+def tradedate(t) -> date:
+	return t.datein
+
+def dateslice(trades: list, since: date = None, until: date = None) -> list:
+	"""trades within [since, until] out of a list sorted by date"""
+	lo = 0 if since is None else bisect_left(trades, since, key=tradedate)
+	hi = len(trades) if until is None else bisect_right(trades, until, key=tradedate)
+	return trades[lo:hi]
+
+def traderow(trades: list, t) -> int:
+	"""where to insert t in a list sorted by date, after trades on its date"""
+	return bisect_right(trades, t.datein, key=tradedate)
+
+def movetrade(trades: list, t) -> bool:
+	"""put t back in date order if it is in trades; true if moved"""
+	for i, x in enumerate(trades):
+		if x is t:
+			break
+	else:
+		return False
+	if (i == 0 or trades[i-1].datein <= t.datein) and (
+			i == len(trades)-1 or t.datein <= trades[i+1].datein):
+		return False
+	del trades[i]
+	trades.insert(traderow(trades, t), t)
+	return True
+
+def tradecolumns(trades: list) -> list:
+	"""trade fields by column, numbers packed, for snapshots"""
+	cols = []
+	for f in fields(Trade):
+		c = [getattr(t, f.name) for t in trades]
+		if f.type is float:
+			c = array("d", c)
+		elif f.type is int:
+			c = array("q", c)
+		cols.append(c)
+	return cols
+
+def columntrades(cols: list, rb = None) -> list:
+	"""trades out of tradecolumns()"""
+	n = len(cols[0]) if cols else 0
+	trades = [Trade.__new__(Trade) for _ in range(n)]
+	# set slots a column at a time, it is much faster than Trade(...)
+	for f, c in zip(fields(Trade), cols):
+		if isinstance(c, array):
+			c = c.tolist()
+		list(map(getattr(Trade, f.name).__set__, trades, c))
+	list(map(Trade.rb.__set__, trades, [rb]*n))
+	list(map(Trade.memo.__set__, trades, [None]*n))
+	return trades
+
+def scangraphs(gdir: str) -> set[str]:
+	"""names of the files in gdir, in normcase"""
+	try:
+		with os.scandir(gdir) as it:
+			return {os.path.normcase(e.name) for e in it}
+	except OSError:
+		return set()
+
+def filekey(path: str) -> str:
+	"""size, mtime and hash of a file, to know if it changed"""
+	st = os.stat(path)
+	with open(path, "rb") as f:
+		h = hashlib.sha1(f.read()).hexdigest()
+	return f"{st.st_size}:{st.st_mtime_ns}:{h}"
+
+def splitpairs(pairs, fname: str) -> tuple[list[object], list[dict]]:
+	"""objects and errors out of iter_objects_from_csv pairs"""
+	objs = []
+	errors = []
+	for o, e in pairs:
+		if e is None:
+			objs.append(o)
+		else:
+			e["file"] = fname
+			errors.append(e)
+	return objs, errors
+
+def diffrows(old: list, new: list, key: str) -> list[tuple]:
+	"""
+	edits to make old equal to new, matching rows by their key field:
+	("update", i, obj), ("remove", i, n), or ("insert", i, objs).
+	They are in reverse order, so each position holds when applied in turn.
+	Rows equal in both are left alone.
+	"""
+	okeys = [getattr(o, key) for o in old]
+	nkeys = [getattr(o, key) for o in new]
+	sm = difflib.SequenceMatcher(None, okeys, nkeys, autojunk=False)
+	groups = []
+	for tag, i1, i2, j1, j2 in sm.get_opcodes():
+		ops = []
+		if tag == "equal":
+			for i, j in zip(range(i1, i2), range(j1, j2)):
+				if old[i] != new[j]:
+					ops.append(("update", i, new[j]))
+		else:
+			if i2 > i1:
+				ops.append(("remove", i1, i2-i1))
+			if j2 > j1:
+				ops.append(("insert", i1, new[j1:j2]))
+		if ops:
+			groups.append(ops)
+	return [op for ops in reversed(groups) for op in ops]
+
+def applyrows(objs: list, ops: list[tuple]) -> None:
+	"""apply edits from diffrows to objs"""
+	for op, i, x in ops:
+		if op == "update":
+			objs[i] = x
+		elif op == "remove":
+			del objs[i:i+x]
+		else:
+			objs[i:i] = x
+
+def tradeparts(dirpath: str) -> dict[int, str]:
+	"""files for trades partitioned by year in dirpath"""
+	parts = {}
+	try:
+		with os.scandir(dirpath) as it:
+			for e in it:
+				m = PARTRE.match(e.name)
+				if m:
+					parts[int(m.group(1))] = e.path
+	except OSError:
+		pass
+	return parts
+
+def maxtradeid(path: str) -> int:
+	"""greatest trade id in a trades file, without decoding it"""
+	n = 0
+	with open(path, newline="", encoding="utf-8") as f:
+		r = csv.reader(f, delimiter=CSV_SEP)
+		next(r, None)
+		for row in r:
+			if row and row[0].strip().isdigit():
+				n = max(n, int(row[0]))
+	return n
+
+def filestat(path: str) -> tuple:
+	"""(size, mtime) to tell when a file changed"""
+	try:
+		st = os.stat(path)
+	except OSError:
+		return None
+	return (st.st_size, st.st_mtime_ns)
+
 def copyfile(src: str, dst: str) -> None:
 	try:
 		shutil.copyfile(src, dst)
 	except:
 		pass
 
+def samegraph(src: str, dst: str) -> bool:
+	"""dst is already a copy of src"""
+	try:
+		s1 = os.stat(src)
+		s2 = os.stat(dst)
+	except OSError:
+		return False
+	if s1.st_size != s2.st_size:
+		return False
+	if s1.st_mtime_ns == s2.st_mtime_ns:
+		return True
+	with open(src, "rb") as f1, open(dst, "rb") as f2:
+		return hashlib.sha1(f1.read()).digest() == hashlib.sha1(f2.read()).digest()
+
+def clonefile(src: str, dst: str) -> bool:
+	"""copy src sharing its blocks, when the file system can"""
+	if fcntl is None:
+		return False
+	try:
+		with open(src, "rb") as f1, open(dst, "wb") as f2:
+			fcntl.ioctl(f2.fileno(), FICLONE, f1.fileno())
+	except OSError:
+		return False
+	shutil.copystat(src, dst)
+	return True
+
+def copygraph(src: str, dst: str, link=False) -> str:
+	"""copy a graph unless dst has it already; hard links are
+	used only with link, as graphs are rewritten in place.
+	Returns "same", "linked" or "copied".
+	"""
+	try:
+		if os.path.samefile(src, dst) or samegraph(src, dst):
+			return "same"
+	except OSError:
+		pass
+	if link:
+		tmp = dst + BCK
+		try:
+			if os.path.exists(tmp):
+				os.remove(tmp)
+			os.link(src, tmp)
+			os.replace(tmp, dst)
+			return "linked"
+		except OSError:
+			pass
+	if not clonefile(src, dst):
+		# copy2 keeps mtime, so samegraph skips it next time
+		shutil.copy2(src, dst)
+	return "copied"
+
+class GraphCopier:
+	"""
+	copies (src, dst) graphs in a thread pool. Progress is in
+	ndone and counts, failures in errors; cancel() stops
+	copies not yet started.
+	"""
+	def __init__(self, jobs: list[tuple[str, str]], link=False, workers=GRAPHWORKERS):
+		self.jobs = jobs
+		self.link = link
+		self.ndone = 0
+		self.counts = {}
+		self.errors = []
+		self.cancelled = False
+		self.lk = threading.Lock()
+		self.ex = None
+		self.futures = []
+		self.workers = workers
+
+	def start(self) -> "GraphCopier":
+		self.ex = ThreadPoolExecutor(self.workers)
+		self.futures = [self.ex.submit(self.copy, s, d) for s, d in self.jobs]
+		self.ex.shutdown(wait=False)
+		return self
+
+	def copy(self, src: str, dst: str) -> None:
+		if self.cancelled:
+			return
+		try:
+			r = copygraph(src, dst, self.link)
+		except Exception as e:
+			r = "failed"
+			with self.lk:
+				self.errors.append(f"{src}: {e}")
+		with self.lk:
+			self.ndone += 1
+			self.counts[r] = self.counts.get(r, 0) + 1
+
+	def done(self) -> bool:
+		return all(f.done() for f in self.futures)
+
+	def cancel(self) -> None:
+		self.cancelled = True
+		for f in self.futures:
+			f.cancel()
+
+	def wait(self) -> "GraphCopier":
+		for f in self.futures:
+			if not f.cancelled():
+				f.result()
+		return self
+
+	def report(self) -> str:
+		with self.lk:
+			cs = ", ".join(f"{n} {k}" for k, n in sorted(self.counts.items()))
+		return f"{self.ndone}/{len(self.jobs)} graphs: {cs}"
+
+class TradeTotals:
+	"""
+	euros and counts per result for the trades, overall and per day,
+	kept up to date as trades are added and removed. Buckets map
+	each Result to [count, euros], without results not present.
+	"""
+	def __init__(self, trades = ()):
+		self.parts = {}
+		self.all = {}
+		self.days = {}
+		self.last = None
+		for t in trades:
+			self.add(t)
+
+	def add(self, t) -> None:
+		"""add t, or update it if it was added before"""
+		self.remove(t)
+		d, r, v = t.datein, t.result(), t.ptseuros()
+		self.parts[id(t)] = (d, r, v)
+		for b in (self.all, self.days.setdefault(d, {})):
+			x = b.get(r)
+			if x is None:
+				x = b[r] = [0, 0.0]
+			x[0] += 1
+			x[1] += v
+		if d is not None and self.last is not False and (self.last is None or d > self.last):
+			self.last = d
+
+	def remove(self, t) -> None:
+		p = self.parts.pop(id(t), None)
+		if p is None:
+			return
+		d, r, v = p
+		day = self.days[d]
+		for b in (self.all, day):
+			x = b[r]
+			x[0] -= 1
+			x[1] -= v
+			if x[0] == 0:
+				del b[r]
+		if len(day) == 0:
+			del self.days[d]
+			if d == self.last:
+				# found again if asked for
+				self.last = False
+
+	def lastday(self) -> date:
+		"""date of the last trade, as for stats.Filter.thisday"""
+		if self.last is False:
+			ds = [d for d in self.days if d is not None]
+			self.last = max(ds) if ds else None
+		return self.last
+
+	def day(self, d: date = None) -> dict:
+		"""bucket for day d, the last one by default"""
+		if d is None:
+			d = self.lastday()
+		return self.days.get(d, {})
+
+class TradeStore:
+	"""trade values kept in columns, to run queries without
+	walking trade objects. Rows of removed trades become holes
+	until the store is built again.
+	"""
+	def __init__(self, trades = None):
+		self.build(trades or [])
+
+	def build(self, trades) -> None:
+		self.trades = []
+		self.rows = {}
+		self.nholes = 0
+		self.instrids = {}
+		self.setupids = {}
+		self.featbits = {}
+		self.date = array("i")
+		self.hour = array("b")
+		self.wday = array("b")
+		self.dir = array("b")
+		self.lots = array("d")
+		self.tp = array("d")
+		self.stop = array("d")
+		self.out = array("d")
+		self.euros = array("d")
+		self.instr = array("i")
+		self.setup = array("i")
+		# feature bitmasks, as ints they have no size limit
+		self.feats = []
+		for t in trades:
+			self.put(t)
+
+	def columns(self) -> tuple:
+		return (self.date, self.hour, self.wday, self.dir, self.lots,
+			self.tp, self.stop, self.out, self.euros, self.instr, self.setup, self.feats)
+
+	@staticmethod
+	def nameid(ids: dict, name: str) -> int:
+		return ids.setdefault(name, len(ids))
+
+	def featmask(self, names) -> int:
+		m = 0
+		for n in names or ():
+			m |= 1 << TradeStore.nameid(self.featbits, n)
+		return m
+
+	def values(self, t) -> tuple:
+		return (t.datein.toordinal(), t.hour(), int(t.dayofweek()),
+			0 if t.dir == Dir.Long else 1, t.lots or 0.0,
+			t.tp or 0.0, t.stop or 0.0, t.out or 0.0, t.euros or 0.0,
+			TradeStore.nameid(self.instrids, t.instrument),
+			TradeStore.nameid(self.setupids, t.setup),
+			self.featmask(t.has))
+
+	def put(self, t) -> None:
+		"""add or update the row for t"""
+		vals = self.values(t)
+		r = self.rows.get(id(t))
+		if r is None:
+			self.rows[id(t)] = len(self.trades)
+			self.trades.append(t)
+			for c, v in zip(self.columns(), vals):
+				c.append(v)
+			return
+		for c, v in zip(self.columns(), vals):
+			c[r] = v
+
+	def drop(self, t) -> None:
+		r = self.rows.pop(id(t), None)
+		if r is None:
+			return
+		self.trades[r] = None
+		self.nholes += 1
+		if self.nholes > 1000 and self.nholes > len(self.trades) // 2:
+			self.build([t for t in self.trades if t is not None])
+
+	def __len__(self) -> int:
+		return len(self.trades) - self.nholes
+
+	def select(self, flt, order: list = None) -> list:
+		"""trades matching the filter, in date order. Rows are not
+		kept in order: with the list of trades sorted by date in
+		order, trades on the same date are left as they are there.
+		"""
+		if np is not None and len(self.featbits) < 64:
+			rows = self.npselect(flt)
+		else:
+			rows = self.pyselect(flt)
+		trades = self.trades
+		if order is None:
+			rows.sort(key=self.date.__getitem__)
+			trades = [trades[r] for r in rows]
+		else:
+			pos = {id(t): i for i, t in enumerate(order)}
+			trades = sorted((trades[r] for r in rows), key=lambda t: pos[id(t)])
+		if len(flt.results) > 0:
+			trades = [t for t in trades if t.result() in flt.results]
+		return trades
+
+	def conds(self, flt) -> list:
+		"""(column, values) pairs that rows must match"""
+		cc = []
+		if len(flt.setups) > 0:
+			cc.append((self.setup, {self.setupids[s] for s in flt.setups if s in self.setupids}))
+		if len(flt.instruments) > 0:
+			cc.append((self.instr, {self.instrids[i] for i in flt.instruments if i in self.instrids}))
+		if len(flt.dirs) > 0:
+			cc.append((self.dir, {0 if d == Dir.Long else 1 for d in flt.dirs}))
+		if len(flt.hours) > 0:
+			cc.append((self.hour, set(flt.hours)))
+		if len(flt.wdays) > 0:
+			cc.append((self.wday, {int(d) for d in flt.wdays}))
+		return cc
+
+	def datewindow(self, flt) -> tuple[int, int]|None:
+		if flt.since is not None and flt.until is not None and flt.since < flt.until:
+			return flt.since.toordinal(), flt.until.toordinal()
+		return None
+
+	def pyselect(self, flt) -> list[int]:
+		rows = [r for r, t in enumerate(self.trades) if t is not None]
+		fb = self.featbits
+		if any(f not in fb for f in flt.musthave):
+			return []
+		must = self.featmask(flt.musthave)
+		cant = sum(1 << fb[f] for f in flt.canthave if f in fb)
+		feats = self.feats
+		if must != 0:
+			rows = [r for r in rows if feats[r] & must == must]
+		if cant != 0:
+			rows = [r for r in rows if feats[r] & cant == 0]
+		for col, vals in self.conds(flt):
+			rows = [r for r in rows if col[r] in vals]
+		w = self.datewindow(flt)
+		if w is not None:
+			dt = self.date
+			rows = [r for r in rows if w[0] <= dt[r] <= w[1]]
+		return rows
+
+	def npselect(self, flt) -> list[int]:
+		n = len(self.trades)
+		ok = np.fromiter((t is not None for t in self.trades), dtype=bool, count=n)
+		fb = self.featbits
+		if any(f not in fb for f in flt.musthave):
+			return []
+		must = self.featmask(flt.musthave)
+		cant = sum(1 << fb[f] for f in flt.canthave if f in fb)
+		if must != 0 or cant != 0:
+			feats = np.array(self.feats, dtype=np.uint64)
+			if must != 0:
+				ok &= (feats & np.uint64(must)) == np.uint64(must)
+			if cant != 0:
+				ok &= (feats & np.uint64(cant)) == 0
+		for col, vals in self.conds(flt):
+			c = np.frombuffer(col, dtype=col.typecode)
+			ok &= np.isin(c, list(vals))
+		w = self.datewindow(flt)
+		if w is not None:
+			dt = np.frombuffer(self.date, dtype=np.int32)
+			ok &= (dt >= w[0]) & (dt <= w[1])
+		return np.flatnonzero(ok).tolist()
+
+# journal operations
+JPUT = "PUT"
+JDEL = "DEL"
+
+class TradeArchive(MappedCsv):
+	"""
+	trades in a trades file, decoded as they are used, for files
+	too large to load. Trades are found by id without decoding them.
+	Bad rows show as empty trades with the errors in their notes.
+	"""
+	def __init__(self, path: str, rb):
+		self.rb = rb
+		self.migrate = rb.account.version < VERSION
+		super().__init__(path, rb.tradeclass(), TRADERENAMES)
+		self.ids = array("q", map(self.recordid, range(len(self))))
+		self.order = None
+
+	def recordid(self, i: int) -> int:
+		"""trade id for record i, or -1"""
+		a = self.offsets[i]
+		end = self.offsets[i+1]
+		e = self.data.find(CSV_SEP.encode(), a, end)
+		if e < 0:
+			# a single field record
+			e = end
+		x = self.data[a:e].strip(b'" \t\r\n')
+		return int(x) if x.isdigit() else -1
+
+	def find(self, tid: int) -> int:
+		"""index for trade tid, or -1"""
+		if self.order is None:
+			self.order = array("q", sorted(range(len(self)), key=self.ids.__getitem__))
+		i = bisect_left(self.order, tid, key=self.ids.__getitem__)
+		if i < len(self.order) and self.ids[self.order[i]] == tid:
+			return self.order[i]
+		return -1
+
+	def obj(self, i: int) -> object:
+		t, e = self.get(i)
+		if e is not None:
+			t = Trade(trade=max(self.ids[i], 0), notes="; ".join(e["errors"]))
+		elif self.migrate:
+			t = Trade.old2new(t)
+		t.rb = self.rb
+		t.compact()
+		return t
+
+class TradeJournal:
+	"""
+	append-only log of trades added, edited or deleted since
+	the trades file was saved. Rows are trades.csv rows with an
+	OP column in front.
+	"""
+	def __init__(self, path: str):
+		self.path = path
+		self.fields = csv_fields(Trade, TRADESKIPS)
+
+	def append(self, op: str, t) -> None:
+		new = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+		with open(self.path, "a", newline="", encoding="utf-8") as f:
+			w = csv.writer(f, quotechar='"', quoting=csv.QUOTE_ALL, delimiter=CSV_SEP)
+			if new:
+				w.writerow(["OP"] + csv_header(self.fields, TRADERENAMES))
+			w.writerow([op] + csv_row(t, self.fields))
+			f.flush()
+			os.fsync(f.fileno())
+
+	def records(self):
+		"""yields (op, trade, None) or (op, None, error)"""
+		if not os.path.exists(self.path):
+			return
+		with open(self.path, newline="", encoding="utf-8") as f:
+			reader = csv.reader(f, delimiter=CSV_SEP)
+			header = next(reader, None)
+			if header is None:
+				return
+			decode = compile_decoder(Trade, header[1:], TRADERENAMES)
+			row_num = 1
+			for row in reader:
+				if not row:
+					continue
+				row_num += 1
+				kwargs, errors = decode(row[1:])
+				if errors or not row[0] in (JPUT, JDEL):
+					yield row[0], None, {
+						"file": self.path,
+						"row": row_num,
+						"errors": errors or [f"bad operation '{row[0]}'"],
+						"data": row_dict(header, row)
+					}
+				else:
+					yield row[0], Trade(**kwargs), None
+
+	def remove(self) -> None:
+		if os.path.exists(self.path):
+			os.remove(self.path)
+
+# value of a trade for each stats unit, see stats.tradevalue;
+# the first instrument and currency with a name win, as in RoadBook.mkindex
+SQLINSTR = "(SELECT i.{} FROM instruments i WHERE i.instrument = t.instrument ORDER BY i.row LIMIT 1)"
+SQLTOEUR = f"""(SELECT 1.0 / NULLIF(c.euros2, 0) FROM currencies c
+	WHERE c.name = {SQLINSTR.format("currency")} ORDER BY c.row LIMIT 1)"""
+SQLPT = "(CASE WHEN t.euros != 0 THEN t.euros ELSE t.out END)"
+SQLRESULT = f"(CASE WHEN {SQLPT} > :neutral THEN 1 WHEN {SQLPT} < -:neutral THEN -1 ELSE 0 END)"
+SQLUNITS = {
+	"Euros": f"(CASE WHEN t.euros != 0 THEN t.euros ELSE t.out * t.lots * COALESCE({SQLTOEUR}, 1.0) END)",
+	"Pts": "t.out",
+	"PtsNorm": f"COALESCE(t.out * 260000 / NULLIF({SQLINSTR.format('scale')}, 0), t.out)",
+	"StopPts": "t.stop",
+	"Success": f"(CASE WHEN {SQLRESULT} = 1 THEN 1 ELSE 0 END)",
+	"Failure": f"(CASE WHEN {SQLRESULT} = -1 THEN 1 ELSE 0 END)",
+}
+SQLHOUR = "COALESCE(CAST(substr(t.timein, 1, 2) AS INTEGER), 0)"
+SQLWDAY = "((CAST(strftime('%w', t.datein) AS INTEGER) + 6) % 7)"
+# group keys for SqlBook.groups
+SQLKEYS = {
+	"day": "t.datein",
+	"month": "CAST(substr(t.datein, 1, 4) AS INTEGER) || '-' || CAST(substr(t.datein, 6, 2) AS INTEGER)",
+	"hour": f"printf('%02d', {SQLHOUR})",
+	"wday": SQLWDAY,
+	"result": SQLRESULT,
+	"setup": "t.setup",
+	"instrument": "t.instrument",
+}
+
+class SqlBook:
+	"""roadbook tables kept in a sqlite database, one table per file"""
+	def __init__(self, path: str):
+		self.path = path
+		self.db = sqlite3.connect(path)
+		# table, class, skipped fields and indexed fields
+		self.tables = {
+			ACCOUNTFILE: ("account", Account, None, None),
+			CURRENCIESFILE: ("currencies", Currency, None, ["name"]),
+			INSTRUMENTSFILE: ("instruments", Instrument, None, ["instrument"]),
+			SETUPSFILE: ("setups", Setup, None, None),
+			FEATURESFILE: ("features", Feature, None, None),
+			TRADESFILE: ("trades", Trade, TRADESKIPS,
+				["datein", "setup", "instrument", "has"]),
+		}
+
+	def close(self) -> None:
+		self.db.close()
+
+	def load(self, f: str) -> tuple[list[object], list[dict]]:
+		"""objects and errors for the table kept for file f"""
+		name, cls, skip, _ = self.tables[f]
+		objs, errors = load_objects_from_sql(self.db, name, cls, skip)
+		for e in errors:
+			e["file"] = f"{self.path}:{name}"
+		return objs, errors
+
+	def save(self, f: str, objs: list) -> None:
+		name, cls, skip, idx = self.tables[f]
+		with self.db:
+			write_objects_to_sql(self.db, name, objs, cls, skip, idx)
+
+	def where(self, flt) -> tuple[str, dict]:
+		"""sql condition on trades t for a stats.Filter"""
+		conds = []
+		args = {}
+		def isin(expr, vals, tag):
+			names = []
+			for n, v in enumerate(vals):
+				args[f"{tag}{n}"] = v
+				names.append(f":{tag}{n}")
+			conds.append(f"{expr} IN ({', '.join(names)})")
+		if flt.since is not None and flt.until is not None and flt.since < flt.until:
+			conds.append("t.datein BETWEEN :since AND :until")
+			args["since"] = flt.since.isoformat()
+			args["until"] = flt.until.isoformat()
+		has = link_table("trades", "has")
+		for n, f in enumerate(flt.musthave):
+			args[f"must{n}"] = f
+			conds.append(f"t.row IN (SELECT row FROM {has} WHERE value = :must{n})")
+		for n, f in enumerate(flt.canthave):
+			args[f"cant{n}"] = f
+			conds.append(f"t.row NOT IN (SELECT row FROM {has} WHERE value = :cant{n})")
+		if len(flt.setups) > 0:
+			isin("t.setup", flt.setups, "setup")
+		if len(flt.instruments) > 0:
+			isin("t.instrument", flt.instruments, "instr")
+		if len(flt.dirs) > 0:
+			isin("t.dir", [d.name for d in flt.dirs], "dir")
+		if len(flt.results) > 0:
+			isin(SQLRESULT, [int(r) for r in flt.results], "res")
+		if len(flt.hours) > 0:
+			isin(SQLHOUR, [int(h) for h in flt.hours], "hour")
+		if len(flt.wdays) > 0:
+			isin(SQLWDAY, [int(w) for w in flt.wdays], "wday")
+		if not conds:
+			return "1", args
+		return " AND ".join(conds), args
+
+	def select(self, flt, neutral: float) -> list[int]:
+		"""ids of trades matching a stats.Filter, in order.
+		Not rows: rows that fail to load leave no trade behind.
+		"""
+		cond, args = self.where(flt)
+		args["neutral"] = neutral
+		q = f"SELECT t.trade FROM trades t WHERE {cond} ORDER BY t.row"
+		return [r for r, in self.db.execute(q, args)]
+
+	def groups(self, key: str, unit: str, neutral: float, flt = None) -> list[tuple]:
+		"""(label, total, count) for trades grouped by one of SQLKEYS,
+		valued in one of SQLUNITS, in the order groups are first seen.
+		"""
+		cond, args = ("1", {}) if flt is None else self.where(flt)
+		args["neutral"] = neutral
+		k = SQLKEYS[key]
+		v = SQLUNITS[unit]
+		q = f"""SELECT {k} AS k, SUM({v}), COUNT(*) FROM trades t
+			WHERE {cond} GROUP BY k ORDER BY MIN(t.row)"""
+		return self.db.execute(q, args).fetchall()
+
 class RoadBook:
 	def __init__(self, trades = None, instrs = None,
 			setups = None, features = None, currencies = None):
@@ -356,32 +1161,113 @@ class RoadBook:
 		self.dir = None
 		self.maxid = 0
 		self.dirty = False
+		# tables to be saved, see dirtied()
+		self.dirties = set()
+		self.loaderrs = []
+		# seconds to decode and load each file, see loadtables()
+		self.loadtimes = {}
+		# sqlite database, when not using CSV files
+		self.db = None
+		# last filter used and its result, see filter()
+		self.lastfilter = None
+		# (dir, graph files) for GRAPHSDIR in dir, see graphindex()
+		self.graphs = None
+		# filestat for the files as loaded or saved, see changedfiles()
+		self.filestats = {}
+		# trades kept in a file per year, see usepartitions()
+		self.byyear = False
+		# year partitions not yet loaded: year -> path, see needtrades()
+		self.unloaded = {}
+		self.unloadedids = False
+		# function applying row edits to trades, for whoever shows them
+		self.applytrades = None
+		# optional columns for trades, see usestore()
+		self.store = None
+		# running totals for trades, see running()
+		self.totals = None
+		# bumped when trades change, for results kept by others
+		self.generation = 0
+		# (generation, stats.StatsCube) for trades, see stats.cubefor()
+		self.cube = None
+		self.reindex()
 		self._defaults()
 
 	def nextId(self):
+		if self.unloaded and not self.unloadedids:
+			# ids in partitions not yet loaded must not be reused
+			for p in self.unloaded.values():
+				self.maxid = max(self.maxid, maxtradeid(p))
+			self.unloadedids = True
 		return self.maxid+1
 
+	def dirtied(self, *tables: str) -> None:
+		"""note the tables (files) that changed.
+		With no tables, all of them are saved.
+		"""
+		self.dirty = True
+		self.dirties.update(tables)
+
 
 	def findInstrument(self, name):
-		for i in self.instruments:
-			if i.instrument == name:
-				return i
-		return None
+		return self.instrindex.get(name)
 	def findSetup(self, name):
-		for s in self.setups:
-			if s.setup == name:
-				return s
-		return None
+		return self.setupindex.get(name)
 	def findFeature(self, name):
-		for f in self.features:
-			if f.feature == name:
-				return f
-		return None
+		return self.featureindex.get(name)
 	def findCurrency(self, name):
-		for c in self.currencies:
-			if c.name == name:
-				return c
-		return None
+		return self.currencyindex.get(name)
+
+	@staticmethod
+	def mkindex(objs, key: str) -> dict:
+		"""name to object map; the first one wins for duplicates"""
+		idx = {}
+		for o in objs:
+			idx.setdefault(getattr(o, key), o)
+		return idx
+
+	def indexinstruments(self) -> None:
+		self.instrindex = RoadBook.mkindex(self.instruments, "instrument")
+		self.inval()
+	def indexsetups(self) -> None:
+		self.setupindex = RoadBook.mkindex(self.setups, "setup")
+	def indexfeatures(self) -> None:
+		self.featureindex = RoadBook.mkindex(self.features, "feature")
+	def indexcurrencies(self) -> None:
+		self.currencyindex = RoadBook.mkindex(self.currencies, "name")
+		self.inval()
+
+	def inval(self) -> None:
+		"""forget derived values for all trades, after catalog or account changes"""
+		for t in self.trades:
+			t.inval()
+		self.totals = None
+		self.generation += 1
+
+	def running(self) -> TradeTotals:
+		"""totals for the trades loaded, updated as their uses are"""
+		if self.totals is None:
+			self.totals = TradeTotals(self.trades)
+		return self.totals
+
+	def reindex(self) -> None:
+		"""rebuild the catalog indexes, after rows are added or removed"""
+		self.indexinstruments()
+		self.indexsetups()
+		self.indexfeatures()
+		self.indexcurrencies()
+
+	@staticmethod
+	def renindex(idx: dict, objs, key: str, oname: str, nname: str) -> None:
+		o = idx.pop(oname, None)
+		if o is None:
+			return
+		setattr(o, key, nname)
+		idx[nname] = o
+		for x in objs:
+			# another one with the old name takes its place
+			if x is not o and getattr(x, key) == oname:
+				idx[oname] = x
+				break
 
 	def instrumentNames(self):
 		return [i.instrument for i in self.instruments]
@@ -401,23 +1287,199 @@ class RoadBook:
 		return [c.currency for c in self.currencies]
 
 	def setupUsed(self, name):
-		for t in self.trades:
-			if t.setup == name:
-				return True
-		for f in self.features:
-			if f.setups and name in f.setups:
-				return True
-		return False
+		return name in self.setupusers or name in self.setupfeatures
 	def instrumentUsed(self, name):
-		for t in self.trades:
-			if t.instrument == name:
-				return True
-		return False
+		return name in self.instrusers
 	def featureUsed(self, name):
-		for t in self.trades:
-			if t.has is not None and name in t.has:
-				return True
-		return False
+		return name in self.featureusers
+
+	@staticmethod
+	def uselink(idx: dict, name: str, o) -> None:
+		idx.setdefault(name, {})[id(o)] = o
+
+	@staticmethod
+	def useunlink(idx: dict, name: str, o) -> None:
+		users = idx.get(name)
+		if users is None:
+			return
+		users.pop(id(o), None)
+		if len(users) == 0:
+			del idx[name]
+
+	def cleartradeuses(self) -> None:
+		if self.store is not None:
+			self.store.build([])
+		self.totals = None
+		self.generation += 1
+		self.tradeuses = {}
+		self.instrusers = {}
+		self.setupusers = {}
+		self.featureusers = {}
+
+	def clearfeatureuses(self) -> None:
+		self.featureuses = {}
+		self.setupfeatures = {}
+
+	def adduses(self, o) -> None:
+		"""record the catalog names used by a trade or feature;
+		call again after it changes to update the record.
+		"""
+		self.unlinkuses(o)
+		if isinstance(o, Feature):
+			keys = frozenset(o.setups or ())
+			self.featureuses[id(o)] = (o, keys)
+			for s in keys:
+				RoadBook.uselink(self.setupfeatures, s, o)
+			return
+		keys = (o.instrument, o.setup, internset(o.has))
+		self.tradeuses[id(o)] = (o, keys)
+		if o.instrument:
+			RoadBook.uselink(self.instrusers, o.instrument, o)
+		if o.setup:
+			RoadBook.uselink(self.setupusers, o.setup, o)
+		for f in keys[2]:
+			RoadBook.uselink(self.featureusers, f, o)
+		if self.store is not None:
+			self.store.put(o)
+		if self.totals is not None:
+			self.totals.add(o)
+		self.generation += 1
+
+	def addtradeuses(self, trades) -> None:
+		"""adduses for many trades not yet recorded"""
+		tradeuses = self.tradeuses
+		instrusers = self.instrusers
+		setupusers = self.setupusers
+		featureusers = self.featureusers
+		for t in trades:
+			k = id(t)
+			has = t.has
+			if type(has) is frozenset:
+				has = featuresets.setdefault(has, has)
+			else:
+				has = internset(has)
+			t.has = has
+			tradeuses[k] = (t, (t.instrument, t.setup, has))
+			if t.instrument:
+				instrusers.setdefault(t.instrument, {})[k] = t
+			if t.setup:
+				setupusers.setdefault(t.setup, {})[k] = t
+			for f in has:
+				featureusers.setdefault(f, {})[k] = t
+		if self.store is not None:
+			for t in trades:
+				self.store.put(t)
+		if self.totals is not None:
+			for t in trades:
+				self.totals.add(t)
+		self.generation += 1
+
+	def deluses(self, o) -> None:
+		"""forget the catalog names used by a trade or feature"""
+		self.unlinkuses(o)
+		if self.store is not None and not isinstance(o, Feature):
+			self.store.drop(o)
+
+	def unlinkuses(self, o) -> None:
+		if isinstance(o, Feature):
+			x = self.featureuses.pop(id(o), None)
+			if x is None:
+				return
+			for s in x[1]:
+				RoadBook.useunlink(self.setupfeatures, s, o)
+			return
+		x = self.tradeuses.pop(id(o), None)
+		if x is None:
+			return
+		if self.totals is not None:
+			self.totals.remove(o)
+		self.generation += 1
+		instr, setup, has = x[1]
+		RoadBook.useunlink(self.instrusers, instr, o)
+		RoadBook.useunlink(self.setupusers, setup, o)
+		for f in has:
+			RoadBook.useunlink(self.featureusers, f, o)
+
+	def usestore(self, on = True) -> None:
+		"""keep (or stop keeping) trades also in a TradeStore"""
+		self.store = TradeStore(self.trades) if on else None
+
+	def between(self, since: date = None, until: date = None) -> list[Trade]:
+		"""trades within [since, until], in date order"""
+		return dateslice(self.trades, since, until)
+
+	def addtrade(self, t) -> int:
+		"""insert t in date order, return its position"""
+		i = self.rowfortrade(t)
+		self.trades.insert(i, t)
+		return i
+
+	def rowfortrade(self, t) -> int:
+		"""where t goes in trades, for a table that inserts it
+		there itself right after; addtrade() without the insert
+		"""
+		self.dirties.add(TRADESFILE)
+		self.generation += 1
+		return traderow(self.trades, t)
+
+	def movetrade(self, t) -> bool:
+		"""put t back in date order, also in the filtered trades;
+		true if moved
+		"""
+		moved = movetrade(self.trades, t)
+		if self.filteredtrades:
+			moved = movetrade(self.filteredtrades, t) or moved
+		if moved:
+			self.dirties.add(TRADESFILE)
+			self.generation += 1
+		return moved
+
+	def filter(self, flt) -> list[Trade]:
+		"""trades matching a stats.Filter"""
+		if flt.since is not None and flt.until is not None and flt.since < flt.until:
+			self.needtrades(flt.since)
+		else:
+			self.needtrades()
+		if self.store is not None:
+			ts = self.store.select(flt, self.trades)
+		elif self.sqlclean():
+			byid = {t.trade: t for t in self.trades}
+			ids = self.db.select(flt, self.account.neutral)
+			ts = [byid[i] for i in ids if i in byid]
+		else:
+			ts = flt.apply(self.trades)
+		# trades filtered may change later, see lastfiltered()
+		self.lastfilter = (flt, ts, self.generation)
+		return ts
+
+	def lastfiltered(self, trades: list):
+		"""the stats.Filter that gave trades, if they are the result of
+		the last filter() and no trade changed since; else None.
+		Filtered lists are edited in place, they may no longer match.
+		"""
+		if self.lastfilter is None:
+			return None
+		flt, ts, gen = self.lastfilter
+		if trades is not ts or gen != self.generation:
+			return None
+		return flt
+
+	def sqlclean(self) -> bool:
+		"""the database has what is in memory, queries may go there"""
+		return self.db is not None and not self.dirty and len(self.dirties) == 0
+
+	def sqlgroups(self, trades: list, key: str, unit: str) -> list[tuple]|None:
+		"""SqlBook.groups for trades, if they are all the trades or
+		the last filtered ones and the database is up to date; else None.
+		"""
+		if not self.sqlclean() or unit not in SQLUNITS or key not in SQLKEYS:
+			return None
+		flt = None
+		if trades is not self.trades:
+			flt = self.lastfiltered(trades)
+			if flt is None:
+				return None
+		return self.db.groups(key, unit, self.account.neutral, flt)
 
 	def _defaults(self) -> None:
 		"""add default instr/setup/feature/currency for missing ones"""
@@ -428,52 +1490,47 @@ class RoadBook:
 
 	def reninstrument(self, oname: str, nname: str) -> None:
 		"""rename and update all data"""
-		for t in self.trades:
-			if t.instrument == oname:
-				t.instrument = nname
-		i = self.findInstrument(oname)
-		if i is not None:
-			i.instrument = nname
+		for t in list(self.instrusers.get(oname, {}).values()):
+			t.instrument = nname
+			t.inval()
+			self.adduses(t)
+		RoadBook.renindex(self.instrindex, self.instruments, "instrument", oname, nname)
+		self.dirtied(INSTRUMENTSFILE, TRADESFILE)
 	def rencurrency(self, oname: str, nname: str) -> None:
 		"""rename and update all data"""
 		for i in self.instruments:
 			if i.currency == oname:
 				i.currency = nname
-		c = self.findCurrency(oname)
-		if c is not None:
-			c.currency = nname
+		RoadBook.renindex(self.currencyindex, self.currencies, "name", oname, nname)
+		self.inval()
+		self.dirtied(CURRENCIESFILE, INSTRUMENTSFILE)
 
 	def rensetup(self, oname: str, nname: str) -> None:
 		"""rename and update all data"""
-		for t in self.trades:
-			if t.setup == oname:
-				t.setup = nname
-		for f in self.features:
-			if f.setups is None:
-				f.setups = set([])
-			if oname in f.setups:
-				f.setups.remove(oname)
-				f.setups.add(nname)
-		s = self.findSetup(oname)
-		if s is not None:
-			s.setup = nname
+		for t in list(self.setupusers.get(oname, {}).values()):
+			t.setup = nname
+			self.adduses(t)
+		for f in list(self.setupfeatures.get(oname, {}).values()):
+			f.setups.remove(oname)
+			f.setups.add(nname)
+			self.adduses(f)
+		RoadBook.renindex(self.setupindex, self.setups, "setup", oname, nname)
+		self.dirtied(SETUPSFILE, FEATURESFILE, TRADESFILE)
 
 	def renfeature(self, oname: str, nname: str) -> None:
 		"""rename and update all data"""
-		for t in self.trades:
-			if t.has is None:
-				t.has = set({})
-			if oname in t.has:
-				t.has.remove(oname)
-				t.has.add(nname)
-		f = self.findFeature(oname)
-		if f is not None:
-			f.feature = nname
+		for t in list(self.featureusers.get(oname, {}).values()):
+			t.has = internset(t.has.difference({oname}).union({nname}))
+			self.adduses(t)
+		RoadBook.renindex(self.featureindex, self.features, "feature", oname, nname)
+		self.dirtied(FEATURESFILE, TRADESFILE)
 
 	def defaultsforfeatures(self) -> None:
+		self.clearfeatureuses()
 		for f in self.features:
 			if f != f:
 				self.defaultsetups(f.setups)
+			self.adduses(f)
 
 
 	def defaultsforinstruments(self) -> None:
@@ -486,10 +1543,35 @@ class RoadBook:
 			self.defaultinstr(t.instrument)
 			self.defaultsetup(t.setup)
 			#self.defaultfeatures(t.has, t.setup)
+			self.adduses(t)
 			if t.trade > self.maxid:
 				self.maxid = t.trade
 
+	def deltrade(self, t) -> None:
+		"""forget a trade removed from a table"""
+		self.deluses(t)
+		for i, x in enumerate(self.trades):
+			if x is t:
+				del self.trades[i]
+				self.dirties.add(TRADESFILE)
+				break
+
+	def loadedtrade(self, t):
+		"""t if it is still loaded, else the trade with its id that
+		replaced it (reloadtrades replaces updated trades); None if gone
+		"""
+		if t is None:
+			return None
+		x = self.tradeuses.get(id(t))
+		if x is not None and x[0] is t:
+			return t
+		for o in self.trades:
+			if o.trade == t.trade:
+				return o
+		return None
+
 	def defaultsfortrades(self) -> None:
+		self.cleartradeuses()
 		for t in self.trades:
 			self.defaultsfortrade(t)
 
@@ -501,6 +1583,8 @@ class RoadBook:
 		if ni is None:
 			ni = Instrument(name)
 			self.instruments.append(ni)
+			self.instrindex[name] = ni
+			self.dirties.add(INSTRUMENTSFILE)
 
 	def defaultsetups(self, setups: set[str]) ->None:
 		"""add a default setup for names in setups if not there"""
@@ -517,6 +1601,8 @@ class RoadBook:
 		if ns is None:
 			ns = Setup(name)
 			self.setups.append(ns)
+			self.setupindex[name] = ns
+			self.dirties.add(SETUPSFILE)
 			#print(f"dflt setup {name}", file=sys.stderr)
 			#traceback.print_stack()
 
@@ -528,6 +1614,8 @@ class RoadBook:
 		if nc is None:
 			nc = Currency(name)
 			self.currencies.append(nc)
+			self.currencyindex[name] = nc
+			self.dirties.add(CURRENCIESFILE)
 
 	def defaultfeatures(self, feats: set[str], setup: str = None) -> None:
 		"""add a default for features in feats if not there"""
@@ -544,11 +1632,14 @@ class RoadBook:
 		if nf is None:
 			nf = Feature(name)
 			self.features.append(nf)
+			self.featureindex[name] = nf
+			self.dirties.add(FEATURESFILE)
 			if setup is not None and setup != "":
 				if nf.setups is None:
 					nf.setups = set([])
 				if not setup in nf.setups:
 					nf.setups.add(setup)
+			self.adduses(nf)
 			#self.defaultsetup(setup)
 
 
@@ -561,26 +1652,380 @@ class RoadBook:
 		if dirpath is None:
 			raise "no directory set"
 		self.dir = dirpath
-		_, errs = self.loadaccount()
-
-		_, ierrs = self.loadcurrencies()
-		errs = errs +  ierrs
-		_, ierrs = self.loadinstruments()
-		errs = errs +  ierrs
-		_, ierrs = self.loadsetups()
-		errs = errs +  ierrs
-		_, ierrs = self.loadfeatures()
-		errs = errs +  ierrs
-		_, ierrs = self.loadtrades()
-		errs = errs +  ierrs
+		# defaults added while loading are still to be saved
+		self.dirties = set()
+		self.lastfilter = None
+		self.graphs = None
+		if self.db is not None:
+			self.db.close()
+			self.db = None
+		self.findparts()
+		if os.path.exists(self.sqlpath()):
+			self.db = SqlBook(self.sqlpath())
+			errs = self.loadsql()
+		else:
+			errs = self.loadsnapshot()
+		if errs is None:
+			errs = self.loadtables()
+			self.savesnapshot(errs)
+		# errors in the CSV files, kept in the snapshot
+		self.loaderrs = errs
+		self.filestats = {}
+		if self.db is None:
+			self.notefiles(*TABLES)
+		errs = errs + self.replayjournal()
 		self.dirty = False
 		return errs
 
+	def findparts(self) -> None:
+		"""look for trades partitioned by year. Only the last
+		partition is loaded at first, see needtrades().
+		"""
+		parts = tradeparts(self.dir)
+		self.byyear = len(parts) > 0 and not os.path.exists(self.tradespath())
+		self.unloaded = {}
+		self.unloadedids = False
+		if self.byyear:
+			last = max(parts)
+			self.unloaded = {y: p for y, p in parts.items() if y != last}
+
+	def tradesfile(self) -> str:
+		"""file read for trades when loading"""
+		if self.byyear:
+			return os.path.join(self.dir, PARTFILE.format(self.lastpart()))
+		return self.tradespath()
+
+	def lastpart(self) -> int:
+		"""year for the last trades partition"""
+		parts = tradeparts(self.dir)
+		return max(parts) if parts else date.today().year
+
+	def needtrades(self, since: date = None) -> list[dict]:
+		"""load the trades partitions for since and later years,
+		all of them with no since. Returns errors loading them.
+		"""
+		ys = sorted(y for y in self.unloaded if since is None or y >= since.year)
+		if not ys:
+			return []
+		ts = []
+		errs = []
+		for y in ys:
+			pts, perrs = self.readtrades(self.unloaded.pop(y))
+			ts += pts
+			errs += perrs
+		if not self.trades or not ts or ts[-1].datein <= self.trades[0].datein:
+			ops = [("insert", 0, ts)]
+		else:
+			# not the years they say; merge them in date order
+			ops = diffrows(self.trades, sorted(self.trades + ts, key=tradedate), "trade")
+		apply = self.applytrades
+		if apply is None:
+			apply = partial(applyrows, self.trades)
+		apply(ops)
+		for t in ts:
+			self.defaultsfortrade(t)
+		self.lastfilter = None
+		self.loaderrs = self.loaderrs + errs
+		return errs
+
+	def archive(self, path: str) -> TradeArchive:
+		"""trades in a trades file decoded as they are used; they
+		are not part of the roadbook. The file stays mapped until
+		closed, so files written on save are refused: on some
+		systems a mapped file cannot be replaced.
+		"""
+		live = [self.tradespath()] + list(tradeparts(self.dir).values())
+		key = lambda p: os.path.normcase(os.path.realpath(p))
+		for p in live:
+			if key(path) in (key(p), key(p+BCK)):
+				raise ValueError(f"{path} is saved by the roadbook, archive a copy")
+		return TradeArchive(path, self)
+
+	def needolder(self) -> int:
+		"""load the last partition not yet loaded; returns the number of trades added"""
+		if not self.unloaded:
+			return 0
+		n = len(self.trades)
+		self.needtrades(date(max(self.unloaded), 1, 1))
+		return len(self.trades) - n
+
+	def loadedsince(self) -> date|None:
+		"""date for the first loaded trade, when older ones are not loaded"""
+		if not self.unloaded:
+			return None
+		return self.trades[0].datein if self.trades else date(max(self.unloaded)+1, 1, 1)
+
+	def usepartitions(self, on = True) -> None:
+		"""save trades in a file per year (or in TRADESFILE) from now on"""
+		if on == self.byyear:
+			return
+		if not on:
+			self.needtrades()
+		self.byyear = on
+		self.dirtied(TRADESFILE)
+		if on:
+			# never written again with partitions, see savesnapshot()
+			try:
+				os.remove(self.snapshotpath())
+			except OSError:
+				pass
+
+	def notefiles(self, *tables) -> None:
+		"""note tables as they are in their files now"""
+		for f in tables:
+			self.filestats[f] = filestat(os.path.join(self.dir, f))
+
+	def changedfiles(self) -> list[str]:
+		"""tables whose files changed since loaded or saved"""
+		if self.dir is None or self.db is not None:
+			return []
+		# year partitions are not checked
+		return [f for f in TABLES if f in self.filestats and
+			not (f == TRADESFILE and self.byyear) and
+			filestat(os.path.join(self.dir, f)) != self.filestats[f]]
+
+	def reloadtable(self, f: str, apply = None) -> list[dict]:
+		"""
+		load again table f, changed by other programs, keeping the
+		rows that did not change. apply(ops) is called with the edits
+		for the table list, see diffrows; it defaults to applyrows.
+		Tables with unsaved changes are not reloaded.
+		Returns the errors loading it.
+		"""
+		path = os.path.join(self.dir, f)
+		if f in self.dirties:
+			self.notefiles(f)
+			return [{"file": path, "row": 0, "data": {},
+				"errors": ["changed by another program, not reloaded: it has unsaved changes"]}]
+		self.notefiles(f)
+		if f == ACCOUNTFILE:
+			_, errs = self.loadaccount()
+		elif f == TRADESFILE:
+			errs = self.reloadtrades(apply)
+		else:
+			attr, key = TABLEROWS[f]
+			old = getattr(self, attr)
+			_, errs = {
+				CURRENCIESFILE: self.loadcurrencies,
+				INSTRUMENTSFILE: self.loadinstruments,
+				SETUPSFILE: self.loadsetups,
+				FEATURESFILE: self.loadfeatures,
+			}[f]()
+			ops = diffrows(old, getattr(self, attr), key)
+			setattr(self, attr, old)
+			if apply is None:
+				apply = partial(applyrows, old)
+			apply(ops)
+			self.reindex()
+			self.defaultsforinstruments()
+			self.defaultsforfeatures()
+			self.inval()
+		self.loaderrs = [e for e in self.loaderrs
+			if os.path.basename(e.get("file", "")) != f] + errs
+		return errs
+
+	def reloadtrades(self, apply = None) -> list[dict]:
+		ts, errs = self.readtrades()
+		ops = diffrows(self.trades, ts, "trade")
+		if apply is None:
+			apply = partial(applyrows, self.trades)
+		self.lastfilter = None
+		for op, i, x in ops:
+			# keep uses in step, instead of computing them all again
+			if op == "update":
+				self.deluses(self.trades[i])
+			elif op == "remove":
+				for t in self.trades[i:i+x]:
+					self.deluses(t)
+			apply([(op, i, x)])
+			if op == "update":
+				self.defaultsfortrade(x)
+			elif op == "insert":
+				for t in x:
+					self.defaultsfortrade(t)
+		return errs
+
+	def loadtables(self) -> list[dict]:
+		"""load the CSV files. They are decoded concurrently but
+		loaded in order: the account version tells how to decode
+		trades, and the defaults for trades need the catalogs.
+		Trades are decoded once the account is in, while the
+		catalogs load. Decode and load times per file are left in loadtimes.
+		"""
+		self.loadtimes = {}
+		classes = {
+			ACCOUNTFILE: Account,
+			CURRENCIESFILE: Currency,
+			INSTRUMENTSFILE: Instrument,
+			SETUPSFILE: Setup,
+			FEATURESFILE: Feature,
+		}
+		loads = {
+			ACCOUNTFILE: self.loadaccount,
+			CURRENCIESFILE: self.loadcurrencies,
+			INSTRUMENTSFILE: self.loadinstruments,
+			SETUPSFILE: self.loadsetups,
+			FEATURESFILE: self.loadfeatures,
+			TRADESFILE: self.loadtrades,
+		}
+		errs = []
+		with ThreadPoolExecutor(len(TABLES)) as ex:
+			reads = {f: ex.submit(self.readcsv, os.path.join(self.dir, f), c)
+				for f, c in classes.items()}
+			for f in TABLES:
+				pairs = reads[f].result() if f in reads else None
+				t0 = perf_counter()
+				_, ierrs = loads[f](pairs=pairs)
+				self.loadtimes[f] = (self.loadtimes.get(f, 0.0), perf_counter() - t0)
+				errs = errs + ierrs
+				if f == ACCOUNTFILE:
+					reads[TRADESFILE] = ex.submit(self.readcsv, self.tradesfile(),
+						self.tradeclass(), TRADERENAMES, TRADESFILE)
+		return errs
+
+	def loadreport(self) -> str:
+		"""decode+load seconds for each file loaded"""
+		tt = self.loadtimes
+		return ", ".join(f"{f} {tt[f][0]:.2f}+{tt[f][1]:.2f}s" for f in TABLES if f in tt)
+
+	def readcsv(self, fname: str, cls, renames: dict[str,str] = None, table: str = None) -> list[tuple]:
+		"""decoded (object, error) pairs for a file, timed in loadtimes"""
+		t0 = perf_counter()
+		pairs = list(iter_objects_from_csv(fname, cls, renames))
+		self.loadtimes[table or os.path.basename(fname)] = perf_counter() - t0
+		return pairs
+
+	def tradeclass(self):
+		"""class to decode trades, given the account version"""
+		if self.account.version < VERSION:
+			return Trade1
+		return Trade
+
+	def loadsql(self) -> list[dict]:
+		"""load tables from the database, as loadtables does from CSV files"""
+		errs = []
+		tabs = {}
+		for f in TABLES:
+			tabs[f], ferrs = self.db.load(f)
+			errs = errs + ferrs
+		if len(tabs[ACCOUNTFILE]) == 0:
+			raise ValueError(f"{self.sqlpath()}: no account")
+		self.account = tabs[ACCOUNTFILE][0]
+		self.currencies = tabs[CURRENCIESFILE]
+		self.instruments = tabs[INSTRUMENTSFILE]
+		self.setups = tabs[SETUPSFILE]
+		self.features = tabs[FEATURESFILE]
+		self.trades = tabs[TRADESFILE]
+		self.filteredtrades = None
+		self.reindex()
+		self._defaults()
+		return errs
+
+	def savesql(self, tables) -> None:
+		objs = {
+			ACCOUNTFILE: [self.account],
+			CURRENCIESFILE: self.currencies,
+			INSTRUMENTSFILE: self.instruments,
+			SETUPSFILE: self.setups,
+			FEATURESFILE: self.features,
+			TRADESFILE: self.trades,
+		}
+		for f in TABLES:
+			if f in tables:
+				self.db.save(f, objs[f])
+
+	def tosql(self) -> None:
+		"""keep the roadbook in a sqlite database instead of CSV files.
+		CSV files are left as they are; tocsv() goes back to them.
+		"""
+		self.needtrades()
+		if self.db is None:
+			self.db = SqlBook(self.sqlpath())
+		self.dirties = set(TABLES)
+		self.save()
+
+	def tocsv(self) -> None:
+		"""keep the roadbook in CSV files again"""
+		if self.db is None:
+			return
+		self.db.close()
+		self.db = None
+		os.replace(self.sqlpath(), self.sqlpath(BCK))
+		self.dirties = set(TABLES)
+		self.save()
+
+	def sqlpath(self, suff = "") -> str:
+		return os.path.join(self.dir, SQLFILE) + suff
+
+	def snapshotpath(self, suff = "") -> str:
+		return os.path.join(self.dir, SNAPSHOTFILE) + suff
+
+	def snapshotkey(self) -> bytes:
+		"""first line of the snapshot: versions and size, mtime
+		and hash of the CSV files. Checked before unpickling the rest.
+		"""
+		keys = [filekey(os.path.join(self.dir, f)) for f in TABLES]
+		return f"roadbook {SNAPVERSION} {VERSION} {' '.join(keys)}\n".encode()
+
+	def savesnapshot(self, errs: list[dict]) -> None:
+		"""record the tables as loaded from (or saved to) the CSV files.
+		The snapshot is just a cache, CSV files are the source of truth.
+		"""
+		if self.byyear:
+			# partitions load what is needed, there is no snapshot
+			return
+		p = self.snapshotpath()
+		try:
+			tables = (self.account, self.currencies, self.instruments,
+				self.setups, self.features, tradecolumns(self.trades),
+				self.maxid, self.dirties, errs)
+			with open(p + BCK, "wb") as f:
+				f.write(self.snapshotkey())
+				pickle.dump(tables, f, pickle.HIGHEST_PROTOCOL)
+			os.replace(p + BCK, p)
+		except Exception as e:
+			print(f"failed to save snapshot: {e}", file=sys.stderr)
+
+	def loadsnapshot(self) -> list[dict]|None:
+		"""load tables from a fresh snapshot and return the errors
+		found loading the CSV files; None if there is no fresh snapshot.
+		"""
+		if self.byyear:
+			return None
+		try:
+			with open(self.snapshotpath(), "rb") as f:
+				# a stale or foreign file is not unpickled
+				if f.readline(1 << 12) != self.snapshotkey():
+					return None
+				tables = pickle.load(f)
+		except Exception:
+			return None
+		(self.account, self.currencies, self.instruments,
+			self.setups, self.features, cols,
+			self.maxid, self.dirties, errs) = tables
+		self.trades = columntrades(cols, self)
+		self.filteredtrades = None
+		self.reindex()
+		self.clearfeatureuses()
+		for f in self.features:
+			self.adduses(f)
+		self.cleartradeuses()
+		self.addtradeuses(self.trades)
+		return errs
+
 
-	def save(self, dirpath: str = None, filtered=False) -> None:
+	def save(self, dirpath: str = None, filtered=False, copygraphs=True) -> None:
 		"""save files at dir, create it when it does not exist.
+		Only tables that changed are saved, unless saving elsewhere.
+		Without copygraphs, graphs are left to be copied by the caller,
+		see graphcopies().
 		"""
 		savingas = (dirpath is not None and self.dir is not None and dirpath != self.dir)
+		if savingas and not filtered:
+			self.needtrades()
+		tables = self.dirties
+		if savingas or self.dir is None or (self.dirty and not tables):
+			tables = set(TABLES)
 		if dirpath is None:
 			dirpath = self.dir
 		if dirpath is None:
@@ -592,15 +2037,36 @@ class RoadBook:
 		gdir = os.path.join(dirpath, GRAPHSDIR)
 		try:
 			os.makedirs(gdir, exist_ok = True)
-			self.saveaccount()
-			self.savecurrencies()
-			self.saveinstruments()
-			self.savesetups()
-			self.savefeatures()
-			self.savetrades(filtered=filtered)
+			if self.db is not None and not savingas:
+				self.savesql(tables)
+				if TRADESFILE in tables:
+					TradeJournal(self.journalpath()).remove()
+				self.dirty = False
+				self.dirties = set()
+				return
+			if ACCOUNTFILE in tables:
+				self.saveaccount()
+			if CURRENCIESFILE in tables:
+				self.savecurrencies()
+			if INSTRUMENTSFILE in tables:
+				self.saveinstruments()
+			if SETUPSFILE in tables:
+				self.savesetups()
+			if FEATURESFILE in tables:
+				self.savefeatures()
+			if TRADESFILE in tables:
+				self.savetrades(filtered=filtered)
+				if not savingas:
+					TradeJournal(self.journalpath()).remove()
 			if not savingas:
 				self.dirty = False
-			elif self.account and self.account.copygraphs:
+				self.dirties = set()
+				self.loaderrs = [e for e in self.loaderrs
+					if os.path.basename(e.get("file", "")) not in tables]
+				self.notefiles(*tables)
+				if not os.path.exists(self.journalpath()):
+					self.savesnapshot(self.loaderrs)
+			elif copygraphs and self.account and self.account.copygraphs:
 				self.savegraphs(filtered=filtered)
 		finally:
 			self.dir = saved
@@ -610,7 +2076,9 @@ class RoadBook:
 		try:
 			p1 = os.path.join(path, TRADESFILE)
 			p2 = os.path.join(path, ACCOUNTFILE)
-			return os.path.exists(p1) and os.path.exists(p2)
+			if os.path.exists(os.path.join(path, SQLFILE)):
+				return True
+			return (os.path.exists(p1) or len(tradeparts(path)) > 0) and os.path.exists(p2)
 		except:
 			return False
 
@@ -626,6 +2094,48 @@ class RoadBook:
 		return os.path.join(self.dir, FEATURESFILE) + suff
 	def tradespath(self, suff = "") -> str:
 		return os.path.join(self.dir, TRADESFILE) + suff
+	def journalpath(self, suff = "") -> str:
+		return os.path.join(self.dir, JOURNALFILE) + suff
+
+	def logtrade(self, op: str, t) -> None:
+		"""record a trade change in the journal, until trades are saved"""
+		if self.dir is None:
+			return
+		try:
+			TradeJournal(self.journalpath()).append(op, t)
+		except Exception as e:
+			print(f"failed to journal trade {t.trade}: {e}", file=sys.stderr)
+
+	def replayjournal(self) -> list[dict]:
+		"""apply the trade changes journaled since trades were saved"""
+		errs = []
+		if os.path.exists(self.journalpath()):
+			# trades journaled could be in any partition
+			errs += self.needtrades()
+			# even if no trade changes, the next save removes the journal
+			self.dirties.add(TRADESFILE)
+		byid = {t.trade: t for t in self.trades}
+		for op, t, e in TradeJournal(self.journalpath()).records():
+			if e is not None:
+				errs.append(e)
+				continue
+			o = byid.get(t.trade)
+			if op == JDEL:
+				if o is not None:
+					del byid[t.trade]
+					self.deltrade(o)
+				continue
+			if o is None:
+				self.addtrade(t)
+				byid[t.trade] = o = t
+			else:
+				# edited in place, as it was in the table
+				o.copy_from(t)
+				o.compact()
+				self.movetrade(o)
+				self.dirties.add(TRADESFILE)
+			self.defaultsfortrade(o)
+		return errs
 
 	def mknew(file_path: str) -> None:
 		gdir = os.path.join(file_path, GRAPHSDIR)
@@ -662,29 +2172,62 @@ class RoadBook:
 	def graphpaths(self, t) -> list[str]:
 		if t.graf is not None and len(t.graf) > 0:
 			return t.graf
+		gs = self.foundgraphs(t)
+		if gs:
+			return gs
+		return [self.mkgraphpath(t)]
+
+	def graphindex(self, rescan=False) -> set[str]:
+		"""graph files in GRAPHSDIR, scanned once for each dir
+		and kept up to date by addedgraph()
+		"""
 		d = os.path.join(self.dir, GRAPHSDIR)
-		p = os.path.join(d, f"trade{t.trade}{t.instrument.lower()}.png")
-		return [p]
+		if rescan or self.graphs is None or self.graphs[0] != d:
+			self.graphs = (d, scangraphs(d))
+		return self.graphs[1]
+
+	def addedgraph(self, path: str) -> None:
+		"""note a graph file written at path"""
+		if self.graphs is None:
+			return
+		d, graphs = self.graphs
+		if os.path.normcase(os.path.dirname(path)) != os.path.normcase(d):
+			return
+		graphs.add(os.path.normcase(os.path.basename(path)))
 
-	def loadaccount(self, fname: str = None) -> tuple[object, list[dict]]:
+	def foundgraphs(self, t, nmax=6) -> list[str]:
+		"""graph files for t in GRAPHSDIR, as made by mkgraphpath.
+		Names are not parsed: instruments may have dots and digits.
+		"""
+		graphs = self.graphindex()
+		gs = []
+		for nb in range(nmax):
+			p = self.mkgraphpath(t, nb)
+			if os.path.normcase(os.path.basename(p)) in graphs:
+				gs.append(p)
+		return gs
+
+	def loadaccount(self, fname: str = None, pairs = None) -> tuple[object, list[dict]]:
 		if fname is None or fname == "":
 			fname = self.accountpath()
-		aa, errors = load_objects_from_csv(fname, Account)
-		for e in errors:
-			e["file"] = fname
+		if pairs is None:
+			pairs = iter_objects_from_csv(fname, Account)
+		aa, errors = splitpairs(pairs, fname)
 		if len(aa) == 0:
 			raise "no account"
 		self.account = aa[0]
+		self.inval()
 		return self.account, errors
 
-	def loadcurrencies(self, fname: str = None) -> tuple[list[object], list[dict]]:
+	def loadcurrencies(self, fname: str = None, pairs = None) -> tuple[list[object], list[dict]]:
 		if fname is None or fname == "":
 			fname = self.currenciespath()
-		cs, errors = load_objects_from_csv(fname, Currency)
-		for e in errors:
-			e["file"] = fname
+		if pairs is None:
+			pairs = iter_objects_from_csv(fname, Currency)
+		cs, errors = splitpairs(pairs, fname)
 		cs = sorted(cs, key = lambda t: t.name)
 		self.currencies = cs
+		self.indexcurrencies()
 		return cs, errors
 
 	def savecurrencies(self, fname: str = None) -> None:
@@ -693,14 +2236,15 @@ class RoadBook:
 		copyfile(fname, fname+BCK)
 		write_objects_to_csv(fname, self.currencies, Currency)
 
-	def loadinstruments(self, fname: str = None) -> tuple[list[object], list[dict]]:
+	def loadinstruments(self, fname: str = None, pairs = None) -> tuple[list[object], list[dict]]:
 		if fname is None or fname == "":
 			fname = self.instrumentspath()
-		ii, errors = load_objects_from_csv(fname, Instrument)
-		for e in errors:
-			e["file"] = fname
+		if pairs is None:
+			pairs = iter_objects_from_csv(fname, Instrument)
+		ii, errors = splitpairs(pairs, fname)
 		ii = sorted(ii, key = lambda t: t.instrument.lower())
 		self.instruments = ii
+		self.indexinstruments()
 		self.defaultsforinstruments()
 		return ii, errors
 
@@ -716,14 +2260,15 @@ class RoadBook:
 		copyfile(fname, fname+BCK)
 		write_objects_to_csv(fname, self.instruments, Instrument)
 
-	def loadsetups(self, fname: str = None) -> tuple[list[object], list[dict]]:
+	def loadsetups(self, fname: str = None, pairs = None) -> tuple[list[object], list[dict]]:
 		if fname is None or fname == "":
 			fname = self.setupspath()
-		ss, errors = load_objects_from_csv(fname, Setup)
-		for e in errors:
-			e["file"] = fname
+		if pairs is None:
+			pairs = iter_objects_from_csv(fname, Setup)
+		ss, errors = splitpairs(pairs, fname)
 		ss = sorted(ss, key = lambda t: t.setup.lower())
 		self.setups = ss
+		self.indexsetups()
 		return ss, errors
 
 	def savesetups(self, fname: str = None) -> None:
@@ -732,14 +2277,15 @@ class RoadBook:
 		copyfile(fname, fname+BCK)
 		write_objects_to_csv(fname, self.setups, Setup)
 
-	def loadfeatures(self, fname: str = None) -> tuple[list[object], list[dict]]:
+	def loadfeatures(self, fname: str = None, pairs = None) -> tuple[list[object], list[dict]]:
 		if fname is None or fname == "":
 			fname = self.featurespath()
-		fs, errors = load_objects_from_csv(fname, Feature)
-		for e in errors:
-			e["file"] = fname
+		if pairs is None:
+			pairs = iter_objects_from_csv(fname, Feature)
+		fs, errors = splitpairs(pairs, fname)
 		fs = sorted(fs, key = lambda t: t.feature.lower())
 		self.features = fs
+		self.indexfeatures()
 		self.defaultsforfeatures()
 		return fs, errors
 
@@ -749,61 +2295,106 @@ class RoadBook:
 		copyfile(fname, fname+BCK)
 		write_objects_to_csv(fname, self.features, Feature)
 
-	def loadtrades(self, fname: str = None) -> tuple[list[object], list[dict]]:
-		if fname is None or fname == "":
-			fname = self.tradespath()
-		rens = {"datein":"date", "has":"with"}
-		x = Trade
-		if self.account.version < VERSION:
-			x = Trade1
-		ts, errors = load_objects_from_csv(fname, x, rens)
-		for e in errors:
-			e["file"] = fname
-		if self.account.version != VERSION:
-			self.account.version = VERSION
-			nts = [Trade.old2new(x) for x in ts]
-			ts = nts
-		ts = sorted(ts, key = lambda t: t.datein)
+	def loadtrades(self, fname: str = None, pairs = None) -> tuple[list[object], list[dict]]:
+		ts, errors = self.readtrades(fname, pairs)
 		self.trades = ts
 		self.defaultsfortrades()
 		return ts, errors
 
-	def savetrades(self, fname: str = None, filtered=False) -> None:
+	def readtrades(self, fname: str = None, pairs = None) -> tuple[list[object], list[dict]]:
+		"""trades in the file, in date order, not yet in the roadbook"""
 		if fname is None or fname == "":
-			fname = self.tradespath()
-		copyfile(fname, fname+BCK)
-		rens = {"datein":"date", "has":"with"}
-		skips = {"pts"}
+			fname = self.tradesfile()
+		if pairs is None:
+			pairs = iter_objects_from_csv(fname, self.tradeclass(), TRADERENAMES)
+		migrate = self.account.version != VERSION
+		ts = []
+		errors = []
+		inorder = True
+		for t, e in pairs:
+			if e is not None:
+				e["file"] = fname
+				errors.append(e)
+				continue
+			if migrate:
+				t = Trade.old2new(t)
+			if inorder and ts and t.datein < ts[-1].datein:
+				inorder = False
+			ts.append(t)
+		if migrate:
+			self.account.version = VERSION
+			self.dirties.update((ACCOUNTFILE, TRADESFILE))
+		if not inorder:
+			ts.sort(key=tradedate)
+		return ts, errors
+
+	def savetrades(self, fname: str = None, filtered=False) -> None:
 		trades = self.trades
 		if filtered and self.filteredtrades:
 			trades = self.filteredtrades
+		self.graphindex(rescan=True)
 		for t in trades:
 			if t.graf is None or len(t.graf) == 0:
-				t.graf = []
-				for nb in range(6):
-					npath = self.mkgraphpath(t, nb)
-					if os.path.exists(npath):
-						t.graf.append(npath)
-		write_objects_to_csv(fname, trades, Trade, rens, skips)
-
+				t.graf = self.foundgraphs(t)
+		if fname is None or fname == "":
+			if self.byyear:
+				self.saveparts(trades)
+				return
+			# files for the other layout are old now
+			for p in tradeparts(self.dir).values():
+				os.replace(p, p+BCK)
+			fname = self.tradespath()
+		copyfile(fname, fname+BCK)
+		write_objects_to_csv(fname, trades, Trade, TRADERENAMES, TRADESKIPS)
 
-	def savegraphs(self, filtered=False) -> None:
+	def saveparts(self, trades) -> None:
+		"""save trades in a file per year. Partitions not loaded are
+		kept as they are, unless trades moved into their years.
+		"""
+		if trades is self.trades:
+			moved = [y for y in set(t.datein.year for t in trades) if y in self.unloaded]
+			if moved:
+				# trades are loaded in place
+				self.needtrades(date(min(moved), 1, 1))
+		byyear = {}
+		for t in trades:
+			byyear.setdefault(t.datein.year, []).append(t)
+		for y, ts in byyear.items():
+			p = os.path.join(self.dir, PARTFILE.format(y))
+			copyfile(p, p+BCK)
+			write_objects_to_csv(p, ts, Trade, TRADERENAMES, TRADESKIPS)
+		for y, p in tradeparts(self.dir).items():
+			# partitions left with no trades, but those not loaded
+			if y not in byyear and self.unloaded.get(y) != p:
+				os.replace(p, p+BCK)
+		p = self.tradespath()
+		if os.path.exists(p):
+			os.replace(p, p+BCK)
+
+
+	def graphcopies(self, dirpath: str = None, filtered=False) -> list[tuple[str, str]]:
+		"""(src, dst) for the graphs of trades to be copied to dirpath"""
+		if dirpath is None:
+			dirpath = self.dir
+		gdir = os.path.join(dirpath, GRAPHSDIR)
 		trades = self.trades
 		if filtered and self.filteredtrades:
 			trades = self.filteredtrades
+		jobs = []
 		for t in trades:
 			if t.graf is None or len(t.graf) == 0:
 				continue
 			for i,g in enumerate(t.graf):
-				if not os.path.exists(t.graf):
+				if not os.path.exists(g):
 					continue
-				npath = self.mkgraphpath(t, i)
-				try:
-					if os.path.samefile(g, npath):
-						continue
-				except:
-					pass
-				try:
-					shutil.copyfile(g, npath)
-				except Exception as e:
-					print(f"failed to copy graphic {e}", file=sys.stderr)
+				npath = os.path.join(gdir, os.path.basename(self.mkgraphpath(t, i)))
+				jobs.append((g, npath))
+		return jobs
+
+	def savegraphs(self, filtered=False) -> None:
+		jobs = self.graphcopies(filtered=filtered)
+		cp = GraphCopier(jobs).start().wait()
+		for e in cp.errors:
+			print(f"failed to copy graphic {e}", file=sys.stderr)
+		for _, dst in jobs:
+			self.addedgraph(dst)
@@ -3,13 +3,13 @@
 #
 import sys
 
-from PySide6.QtCore import Qt, QDate
+from PySide6.QtCore import Qt, QDate, QTimer, QObject, QFileSystemWatcher
 from PySide6.QtGui import QAction
 from PySide6.QtWidgets import QStyle
 from PySide6.QtWidgets import QToolBar
 from PySide6.QtWidgets import (
 	QWidget, QVBoxLayout, QHBoxLayout,
-	QCheckBox, QLabel, QFileDialog, QPlainTextEdit
+	QCheckBox, QLabel, QFileDialog, QPlainTextEdit, QProgressDialog
 )
 import traceback
 from filterwin import *
@@ -69,6 +69,16 @@ def mktoolbar(dwin, rbs=None):
 			toolbar.addAction(a)
 			fmenu.addAction(a)
 			a.triggered.connect(fns[i])
+		arch = QAction("Open Archive", dwin)
+		arch.setStatusTip("browse a large trades file without loading it")
+		arch.triggered.connect(dwin.openarchive)
+		fmenu.addAction(arch)
+		sql = QAction("Keep in SQLite", dwin)
+		sql.setCheckable(True)
+		sql.setStatusTip("keep the roadbook in a sqlite database instead of CSV files")
+		sql.triggered.connect(dwin.usesqlite)
+		fmenu.addAction(sql)
+		dwin.sqlaction = sql
 		if rbs is not None:
 			for rb in rbs:
 				txt = os.path.basename(rb)
@@ -149,12 +159,15 @@ class AccountEdit(QWidget):
 		self.cpbox = QCheckBox("Copy Graphs")
 		self.cpbox.checkStateChanged.connect(self.edited)
 		self.cpbox.setChecked(True)
+		self.yearbox = QCheckBox("A trades file per year")
+		self.yearbox.checkStateChanged.connect(self.edited)
 
 		#layout.setFieldGrowthPolicy(QFormLayout.FieldGrowthPolicy.ExpandingFieldsGrow)
 		layout.addRow(QLabel("Account"), self.accbox)
 		layout.addRow(QLabel("Neutral"), self.neutbox)
 		layout.addRow(QLabel("Fixed"), self.fixedbox)
 		layout.addRow(QLabel("Copy Graphs"), self.cpbox)
+		layout.addRow(QLabel("Trades per year"), self.yearbox)
 		self.refresh()
 
 	def edited(self):
@@ -168,10 +181,15 @@ class AccountEdit(QWidget):
 		cp = self.cpbox.isChecked()
 		if acc != a.account or neu != a.neutral or fx != a.fixed or cp  != a.copygraphs:
 			rb.account.account = acc
+			if neu != a.neutral:
+				rb.inval()
 			rb.account.neutral = neu
 			rb.account.fixed = fx
 			rb.account.copygraphs = cp
-			self.dwin.dirtied()
+			self.dwin.dirtied(ACCOUNTFILE)
+		if self.yearbox.isChecked() != rb.byyear:
+			rb.usepartitions(self.yearbox.isChecked())
+			self.dwin.dirtied(TRADESFILE)
 
 	def refresh(self):
 		rb = self.dwin.rb
@@ -181,6 +199,7 @@ class AccountEdit(QWidget):
 		self.neutbox.setText(f"{rb.account.neutral}")
 		self.fixedbox.setChecked(rb.account.fixed if rb else True)
 		self.cpbox.setChecked(rb.account.copygraphs if rb else True)
+		self.yearbox.setChecked(rb.byyear)
 
 def alreadyhere(a, b):
 	return re.sub('\..*', '', a) == re.sub('\..*', '', b)
@@ -450,7 +469,8 @@ class TradeEdit(QDialog):
 			if t.graf is not None and len(t.graf) > 0:
 				self.maycopygraphs(t)
 			self.rb.defaultsfortrade(t)
-			self.rb.dirty = True
+			self.rb.logtrade(JPUT, t)
+			self.rb.dirtied(TRADESFILE)
 			if self.dirtiedfn is not None:
 				self.dirtiedfn()
 		except Exception as e:
@@ -484,13 +504,105 @@ class TradeEdit(QDialog):
 				pass
 			try:
 				shutil.copyfile(src, dst)
+				self.rb.addedgraph(dst)
 				t.graf = dstl
 			except Exception as e:
 				print(f"failed to copy graphics: {e}", file=sys.stderr)
 
+class TradeRow(Trade):
+	"""trade used as prototype for the trades table.
+	Trade has slots, this one can carry the table callbacks.
+	"""
+	pass
+
+class ArchiveWindow(QMainWindow):
+	"""read only view of a trades file, see TradeArchive.
+	Trades are decoded as the table shows them.
+	"""
+	def __init__(self, dwin, archive):
+		super().__init__()
+		self.archive = archive
+		self.setWindowTitle(f"Archive {archive.path}")
+		self.resize(1500,800)
+		t = TradeRow()
+		t.copy_from(tradeexample())
+		t.edit = self.readonly
+		t.removing = lambda o, done=False: False
+		t.graphics = dwin.tradegraphics
+		t.info = lambda: f"{len(archive)} trades"
+		rdonly = [f.name for f in fields(Trade)]
+		self.tbl = ObjectTable(t, archive, lambda: Trade(), TRADEVIEWORDER, rdonly, hasedit=False)
+		self.setCentralWidget(self.tbl)
+
+	def readonly(self, t=None, filepath=None):
+		QMessageBox.information(self, "Archive", "Archived trades are read only")
+
+	def closeEvent(self, ev):
+		self.archive.close()
+		ev.accept()
+
 def setfeats(q):
 	q.setFeatures(QDockWidget.DockWidgetFeature.DockWidgetMovable|QDockWidget.DockWidgetFeature.DockWidgetFloatable)
 
+class RoadBookWatcher(QObject):
+	"""
+	reloads roadbook files changed by other programs.
+	Files and GRAPHSDIR are watched, or polled when that fails.
+	Changes are checked a little later, as programs write in steps.
+	"""
+	POLLMS = 2000
+	SETTLEMS = 500
+
+	def __init__(self, dwin):
+		super().__init__(dwin)
+		self.dwin = dwin
+		self.rb = None
+		self.graphstat = None
+		self.w = QFileSystemWatcher(self)
+		self.w.fileChanged.connect(self.changed)
+		self.w.directoryChanged.connect(self.changed)
+		self.settle = QTimer(self)
+		self.settle.setSingleShot(True)
+		self.settle.timeout.connect(self.check)
+		self.poll = QTimer(self)
+		self.poll.timeout.connect(self.check)
+
+	def paths(self):
+		d = self.rb.dir
+		ps = [d, os.path.join(d, GRAPHSDIR)]
+		return ps + [os.path.join(d, f) for f in TABLES if os.path.exists(os.path.join(d, f))]
+
+	def watch(self, rb):
+		self.poll.stop()
+		old = self.w.files() + self.w.directories()
+		if old:
+			self.w.removePaths(old)
+		self.rb = rb
+		if rb is None or rb.dir is None or rb.db is not None:
+			return
+		self.graphstat = filestat(os.path.join(rb.dir, GRAPHSDIR))
+		if self.w.addPaths(self.paths()):
+			self.poll.start(self.POLLMS)
+
+	def changed(self, path):
+		self.settle.start(self.SETTLEMS)
+
+	def check(self):
+		if self.rb is None or self.rb.dir is None:
+			return
+		# files replaced by a rename are no longer watched
+		watched = set(self.w.files() + self.w.directories())
+		gone = [p for p in self.paths() if p not in watched]
+		if gone and self.w.addPaths(gone) and not self.poll.isActive():
+			self.poll.start(self.POLLMS)
+		gs = filestat(os.path.join(self.rb.dir, GRAPHSDIR))
+		if gs != self.graphstat:
+			self.graphstat = gs
+			self.dwin.reloadgraphs()
+		files = self.rb.changedfiles()
+		if files:
+			self.dwin.reloadfiles(files)
+
 class DataWindow(QMainWindow):
 	def __init__(self, app, rbs=None):
 		super().__init__()
@@ -504,6 +616,12 @@ class DataWindow(QMainWindow):
 		self.graphwindow = None
 		self.filterwindow = None
 		self.statswindow = None
+		self.seltrade = None
+		self.selfeature = None
+		# (copier, dialog, timer) while graphs are copied, see copygraphs()
+		self.graphcopier = None
+		self.watcher = RoadBookWatcher(self)
+		self.archivewindow = None
 
 		self.tradestbl = self.mktradestbl()
 		self.setupstbl = self.mksetupstbl()
@@ -548,14 +666,14 @@ class DataWindow(QMainWindow):
 		self.addDockWidget(Qt.DockWidgetArea.LeftDockWidgetArea, account)
 		self.tabifyDockWidget(currencies, account)
 
-		self.featchecks = CheckBoxGroup([], dirtied=self.dirtied)
+		self.featchecks = CheckBoxGroup([], dirtied=self.dirtiedTradeFeatures)
 		checks = QDockWidget("Trade Features", self)
 		setfeats(checks)
 		checks.setWidget(self.featchecks)
 		self.featcheckswidget = checks
 		self.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, checks)
 
-		self.setupchecks = CheckBoxGroup([], dirtied=self.dirtied)
+		self.setupchecks = CheckBoxGroup([], dirtied=self.dirtiedFeatureSetups)
 		checks = QDockWidget("Feature Setups", self)
 		setfeats(checks)
 		checks.setWidget(self.setupchecks)
@@ -587,6 +705,9 @@ class DataWindow(QMainWindow):
 			self.tradestbl.prev()
 
 	def updatetoday(self):
+		if self.today.rb is self.rb:
+			self.today.refresh()
+			return
 		self.today = TodayPanel(self.rb)
 		self.todaywidget.setWidget(self.today)
 
@@ -650,6 +771,31 @@ class DataWindow(QMainWindow):
 		self.changedata(rb)
 		self.updateTitle()
 
+	def openarchive(self):
+		if not self.rb or not self.rb.dir:
+			QMessageBox.warning(
+				self,
+				"No roadBook",
+				f"Open the roadbook for the archive first")
+			return
+		file_path, _ = QFileDialog.getOpenFileName(
+			self, "Open Trades Archive", self.rb.dir, "CSV files (*.csv)")
+		if not file_path:
+			return
+		try:
+			a = self.rb.archive(file_path)
+		except Exception as e:
+			QMessageBox.warning(self, "Failed to open", f"Failed to open: {e}")
+			return
+		if len(a) == 0:
+			a.close()
+			QMessageBox.warning(self, "Empty archive", f"No trades in {file_path}")
+			return
+		if self.archivewindow is not None:
+			self.archivewindow.close()
+		self.archivewindow = ArchiveWindow(self, a)
+		self.archivewindow.show()
+
 	def saveroadbook(self):
 		if not self.rb or not self.rb.dir:
 			QMessageBox.warning(
@@ -660,6 +806,28 @@ class DataWindow(QMainWindow):
 		self.rb.save()
 		self.updateTitle()
 
+	def usesqlite(self, on):
+		"""keep the roadbook in sqlite (or in CSV files again).
+		Filters and grouped stats go to the database while it is saved.
+		"""
+		if not self.rb or not self.rb.dir:
+			QMessageBox.warning(
+				self,
+				"No roadBook",
+				f"Do not have a roadbook to keep")
+			self.sqlaction.setChecked(False)
+			return
+		if on:
+			self.rb.tosql()
+		else:
+			self.rb.tocsv()
+		# the store would take filters away from the database
+		self.rb.usestore(self.rb.db is None)
+		self.watcher.watch(self.rb)
+		self.updateTitle()
+		if self.statswindow:
+			self.statswindow.plotchanged()
+
 	def saveroadbookas(self):
 		if not self.rb or not self.rb.dir:
 			QMessageBox.warning(
@@ -671,18 +839,54 @@ class DataWindow(QMainWindow):
 			self, "Save (Filtered) Roadbook as", "", "")
 		if not file_path:
 			return
-		self.rb.save(file_path, filtered=True)
+		self.rb.save(file_path, filtered=True, copygraphs=False)
+		if self.rb.account and self.rb.account.copygraphs:
+			self.copygraphs(self.rb.graphcopies(file_path, filtered=True))
+
+	def copygraphs(self, jobs):
+		"""copy graphs in the background, showing progress"""
+		if not jobs:
+			return
+		cp = GraphCopier(jobs).start()
+		dlg = QProgressDialog("Copying graphs...", "Cancel", 0, len(jobs), self)
+		dlg.setWindowTitle("Save Roadbook as")
+		dlg.setMinimumDuration(500)
+		dlg.canceled.connect(cp.cancel)
+		timer = QTimer(dlg)
+		def poll():
+			dlg.setValue(cp.ndone)
+			dlg.setLabelText(cp.report())
+			if cp.done():
+				timer.stop()
+				dlg.reset()
+				for e in cp.errors:
+					print(f"failed to copy graphic {e}", file=sys.stderr)
+				self.statusBar().showMessage(cp.report(), 5000)
+		timer.timeout.connect(poll)
+		timer.start(100)
+		self.graphcopier = (cp, dlg, timer)
 
 	def edittrade(self, trade, filepath=None):
 		if trade.trade == 0:
 			trade.trade = self.rb.nextId()
 		w = TradeEdit(self.rb, trade, self.dirtiedTrades, filepath=filepath)
 		w.exec()
+		self.datemoved(trade)
+
+	def datemoved(self, t):
+		"""keep trades in date order after t changed"""
+		if self.rb is None:
+			return
+		if self.rb.movetrade(t):
+			self.tradestbl.refresh()
+			self.dirtiedTrades()
 
 	def selectedtrade(self, t):
 		if t and t.has is None:
-			t.has = set([])
-		fset = t.has if t else []
+			t.has = internset(None)
+		self.seltrade = t
+		# trades share frozen feature sets; edit a copy
+		fset = set(t.has) if t else set([])
 		self.featcheckswidget.setWindowTitle(f"Trade {t.trade} Features")
 		self.featchecks.updateitems = fset
 		self.featchecks.set_items(self.rb.featureNames(t.setup), fset)
@@ -709,7 +913,8 @@ class DataWindow(QMainWindow):
 		fset = f.setups if f else []
 		x = f"{f.feature} Setups" if f else "Setups"
 		self.setupchecks.updating(fset)
-		self.setupchecks.dirtied = self.dirtied
+		self.selfeature = f
+		self.setupchecks.dirtied = self.dirtiedFeatureSetups
 		self.setupcheckswidget.setWindowTitle(x)
 		self.setupchecks.set_items(self.rb.setupNames(), fset)
 		self.setupcheckswidget.raise_()
@@ -727,7 +932,7 @@ class DataWindow(QMainWindow):
 			self.updateinfo()
 			self.tradestbl.changedata(self.rb.trades)
 		else:
-			self.rb.filteredtrades = flt.apply(self.rb.trades)
+			self.rb.filteredtrades = self.rb.filter(flt)
 			self.updateinfo()
 			self.tradestbl.changedata(self.rb.filteredtrades)
 		if self.statswindow:
@@ -746,14 +951,34 @@ class DataWindow(QMainWindow):
 			self.mkstats()
 		self.statswindow.show()
 
-	def dirtied(self):
+	def dirtied(self, *tables):
 		if not self.rb:
 			return
-		self.rb.dirty = True
+		self.rb.dirtied(*tables)
 		self.updateTitle()
 
+	def dirtiedCatalog(self, table):
+		# instruments and currencies feed values derived for trades
+		if self.rb is not None:
+			self.rb.inval()
+		self.dirtied(table)
+
+	def dirtiedTradeFeatures(self):
+		t = self.seltrade
+		if self.rb is not None and t is not None and self.featchecks.updateitems is not None:
+			t.has = internset(self.featchecks.updateitems)
+			t.inval()
+			self.rb.adduses(t)
+			self.rb.logtrade(JPUT, t)
+		self.dirtied(TRADESFILE)
+
+	def dirtiedFeatureSetups(self):
+		if self.rb is not None and self.selfeature is not None:
+			self.rb.adduses(self.selfeature)
+		self.dirtied(FEATURESFILE)
+
 	def dirtiedTrades(self):
-		self.dirtied()
+		self.dirtied(TRADESFILE)
 		self.updatetoday()
 		self.updateinfo()
 		if self.statswindow:
@@ -775,33 +1000,74 @@ class DataWindow(QMainWindow):
 		if self.rb is None or not self.rb.account:
 			self.info = ""
 			return
-		trades = self.rb.filteredtrades or self.rb.trades
-		tots = StatTotals(self.rb.account, trades)
+		if self.rb.filteredtrades is None:
+			tots = StatTotals.running(self.rb.account, self.rb.running().all)
+		else:
+			tots = StatTotals(self.rb.account, self.rb.filteredtrades or self.rb.trades)
 		self.info = f"Δ{tots.total:+.0f}€ R={tots.pcent:.1f}%"
+		since = self.rb.loadedsince()
+		if since is not None and self.rb.filteredtrades is None:
+			self.info += f" since {since}"
 
 	def infofn(self):
 		self.updateinfo()
 		return self.info
 
 	def mktradestbl(self):
-		t = tradeexample()
+		t = TradeRow()
+		t.copy_from(tradeexample())
 		t.edit = self.edittrade
 		t.selected = self.selectedtrade
 		t.graphics = self.tradegraphics
 		t.filter = self.filter
 		t.stats = self.stats
-		t.dirtied = self.dirtied
+		t.dirtied = partial(self.dirtied, TRADESFILE)
 		t.edited = self.dirtiedTrades
+		t.updated = self.updatedTrade
+		t.removing = self.removingTrade
+		t.rowfor = self.rowfor
 		t.info = self.infofn
+		t.fetcholder = self.fetcholder
 		tbl = ObjectTable(t, [], lambda: Trade(), TRADEVIEWORDER, TRADEVIEWRDONLY, drop=self.drop)
 		return tbl
+	def fetcholder(self):
+		"""load older trades, scrolling past the first one"""
+		if self.rb is None or self.rb.filteredtrades is not None:
+			return 0
+		return self.rb.needolder()
+	def applytrades(self, ops):
+		"""row edits to the roadbook trades, see RoadBook.applytrades"""
+		if self.tradestbl.model.objects is self.rb.trades:
+			self.tradestbl.model.applyrows(ops)
+		else:
+			applyrows(self.rb.trades, ops)
+	def updatedTrade(self, t):
+		t.compact()
+		if self.rb is not None:
+			self.rb.adduses(t)
+			self.rb.logtrade(JPUT, t)
+			self.datemoved(t)
+	def rowfor(self, objects, t):
+		if self.rb is None:
+			return len(objects)
+		if objects is not self.rb.trades:
+			# a filtered view, the roadbook needs it too
+			self.rb.addtrade(t)
+			return traderow(objects, t)
+		# the table inserts t in rb.trades
+		return self.rb.rowfortrade(t)
+	def removingTrade(self, o, done=False):
+		if done and self.rb is not None:
+			self.rb.deltrade(o)
+			self.rb.logtrade(JDEL, o)
+		return True
 	def drop(self, x):
 		#print('XXX', x, file=sys.stderr)
 		pass
 
 	def mksetupstbl(self):
 		s = setupexample()
-		s.dirtied = self.dirtied
+		s.dirtied = partial(self.dirtied, SETUPSFILE)
 		s.renamed = self.renamedSetup
 		s.removing = self.removingSetup
 		return ObjectTable(s, [], lambda: Setup(), hasedit=False )
@@ -811,7 +1077,9 @@ class DataWindow(QMainWindow):
 		try:
 			if oname is not None:
 				self.rb.rensetup(oname, nname)
-			self.dirtied()
+			else:
+				self.rb.indexsetups()
+			self.dirtied(SETUPSFILE)
 			self.tradestbl.refresh()
 			if self.filterwindow is not None:
 				self.filterwindow.refresh()
@@ -819,8 +1087,12 @@ class DataWindow(QMainWindow):
 			print(e, file=sys.stderr)
 	def removingSetup(self, o, done=False):
 		name = o.setup
-		if done and self.filterwindow is not None:
-			self.filterwindow.refresh()
+		if done:
+			if self.rb is not None:
+				self.rb.indexsetups()
+			self.dirtied(SETUPSFILE)
+			if self.filterwindow is not None:
+				self.filterwindow.refresh()
 			return
 		if self.rb is None:
 			return True
@@ -831,17 +1103,20 @@ class DataWindow(QMainWindow):
 	def mkfeaturestbl(self):
 		f = featureexample()
 		f.selected = self.selectedfeature
-		f.dirtied = self.dirtied
+		f.dirtied = partial(self.dirtied, FEATURESFILE)
 		f.renamed = self.renamedFeature
 		f.removing = self.removingFeature
+		f.updated = self.updatedFeature
 		return ObjectTable(f, [], lambda: Feature(), hasedit=False  )
 	def renamedFeature(self, oname, nname):
 		if self.rb is None:
 			return
 		if oname is not None:
 			self.rb.renfeature(oname, nname)
-		# else is a new element
-		self.dirtied()
+		else:
+			# a new element
+			self.rb.indexfeatures()
+		self.dirtied(FEATURESFILE)
 		try:
 			self.tradestbl.refresh()
 			print("refreshD", file=sys.stderr)
@@ -851,10 +1126,18 @@ class DataWindow(QMainWindow):
 				self.filterwindow.refresh()
 		except Exception as e:
 			print(e, file=sys.stderr)
+	def updatedFeature(self, f):
+		if self.rb is not None:
+			self.rb.adduses(f)
 	def removingFeature(self, o, done=False):
 		name = o.feature
-		if done and self.filterwindow is not None:
-			self.filterwindow.refresh()
+		if done:
+			if self.rb is not None:
+				self.rb.deluses(o)
+				self.rb.indexfeatures()
+			self.dirtied(FEATURESFILE)
+			if self.filterwindow is not None:
+				self.filterwindow.refresh()
 			return
 		if self.rb is None:
 			return True
@@ -864,7 +1147,7 @@ class DataWindow(QMainWindow):
 		return True
 	def mkinstrumentstbl(self):
 		i = instrumentexample()
-		i.dirtied = self.dirtied
+		i.dirtied = partial(self.dirtiedCatalog, INSTRUMENTSFILE)
 		i.renamed = self.renamedInstrument
 		i.removing = self.removingInstrument
 		return ObjectTable(i, [], lambda: Instrument(), hasedit=False )
@@ -873,14 +1156,20 @@ class DataWindow(QMainWindow):
 			return
 		if oname is not None:
 			self.rb.reninstrument(oname, nname)
-		self.dirtied()
+		else:
+			self.rb.indexinstruments()
+		self.dirtied(INSTRUMENTSFILE)
 		self.tradestbl.refresh()
 		if self.filterwindow is not None:
 			self.filterwindow.refresh()
 	def removingInstrument(self, o, done=False):
 		name = o.instrument
-		if done and self.filterwindow is not None:
-			self.filterwindow.refresh()
+		if done:
+			if self.rb is not None:
+				self.rb.indexinstruments()
+			self.dirtied(INSTRUMENTSFILE)
+			if self.filterwindow is not None:
+				self.filterwindow.refresh()
 			return
 		if self.rb is None:
 			return True
@@ -890,19 +1179,31 @@ class DataWindow(QMainWindow):
 		return True
 	def mkcurrenciestbl(self):
 		c = currencyexample()
-		c.dirtied = self.dirtied
+		c.dirtied = partial(self.dirtiedCatalog, CURRENCIESFILE)
 		c.renamed = self.renamedCurrency
+		c.removing = self.removingCurrency
 		return ObjectTable(c, [], lambda: Currency(), hasedit=False  )
 	def renamedCurrency(self, oname, nname):
 		if self.rb is None:
 			return
 		if oname is not None:
 			self.rb.rencurrency(oname, nname)
-		self.dirtied()
+		else:
+			self.rb.indexcurrencies()
+		self.dirtied(CURRENCIESFILE)
 		self.instrumentstbl.refresh()
+	def removingCurrency(self, o, done=False):
+		if done and self.rb is not None:
+			self.rb.indexcurrencies()
+			self.dirtied(CURRENCIESFILE)
+		return True
 
 	def changedata(self, r):
 		self.rb = r
+		r.applytrades = self.applytrades
+		# with sqlite, filters go to the database
+		r.usestore(r.db is None)
+		self.sqlaction.setChecked(r.db is not None)
 		try:
 			self.updateinfo()
 			self.tradestbl.changedata(r.trades)
@@ -914,11 +1215,72 @@ class DataWindow(QMainWindow):
 			self.updateTitle()
 			self.accounttbl.refresh()
 			self.updatetoday()
+			self.watcher.watch(r)
 		except Exception as e:
 			print("failed: ", e, file=sys.stderr)
 			traceback.print_exc()
 		self.updateinfo()
 
+	def reloadfiles(self, files):
+		"""reload tables changed by other programs, row by row"""
+		tables = {
+			CURRENCIESFILE: self.currenciestbl,
+			INSTRUMENTSFILE: self.instrumentstbl,
+			SETUPSFILE: self.setupstbl,
+			FEATURESFILE: self.featurestbl,
+			TRADESFILE: self.tradestbl,
+		}
+		rb = self.rb
+		for f in files:
+			tbl = tables.get(f)
+			flt = None
+			if f == TRADESFILE and rb.filteredtrades is not None:
+				# the table shows filtered trades; filter again below
+				flt = rb.lastfilter[0] if rb.lastfilter else None
+				tbl = None
+			try:
+				errs = rb.reloadtable(f, tbl.model.applyrows if tbl else None)
+			except Exception as e:
+				print(f"failed to reload {f}: {e}", file=sys.stderr)
+				traceback.print_exc()
+				continue
+			for e in errs:
+				print(f"{e['file']}:{e['row']}: {'; '.join(e['errors'])}", file=sys.stderr)
+			if tbl is not None:
+				tbl.refresh()
+			if f == ACCOUNTFILE:
+				self.accounttbl.refresh()
+			if f == FEATURESFILE:
+				self.featchecks.set_items(rb.featureNames())
+			if f == TRADESFILE and rb.filteredtrades is not None:
+				self.setfilter(flt)
+			if f == TRADESFILE:
+				self.reselecttrade()
+		self.updateinfo()
+		self.updatetoday()
+		if self.statswindow:
+			self.statswindow.plotchanged()
+
+	def reselecttrade(self):
+		"""the selected trade may have been replaced by a reload,
+		feature edits must go to the one loaded now"""
+		t = self.rb.loadedtrade(self.seltrade)
+		if t is self.seltrade:
+			return
+		self.seltrade = t
+		if t is None:
+			self.featchecks.updateitems = None
+			return
+		fset = set(t.has or ())
+		self.featchecks.updateitems = fset
+		self.featchecks.set_items(self.rb.featureNames(t.setup), fset)
+
+	def reloadgraphs(self):
+		"""graphs changed by other programs"""
+		self.rb.graphindex(rescan=True)
+		if self.seltrade and self.graphwindow is not None and self.graphwindow.isVisible():
+			self.tradegraphics(self.seltrade)
+
 	def closeEvent(self, ev):
 		if self.rb and self.rb.dirty:
 			if not self.askuser('unsaved changed. sure to quit?'):
@@ -5,7 +5,7 @@ from PySide6.QtWidgets import (
 	QWidget, QVBoxLayout, QHBoxLayout
 )
 from PySide6.QtGui import QPixmap
-from PySide6.QtCore import Qt, QEvent, QDate
+from PySide6.QtCore import Qt, QEvent, QDate, QTimer
 from checklist import *
 from stats import *
 import os
@@ -43,6 +43,9 @@ class FilterWindow(QMainWindow):
 		b_layout.addWidget(QLabel("Until"))
 		b_layout.addWidget(self.b_until)
 		b_layout.addStretch()
+		# what the filter would select, see preview()
+		self.summary = QLabel("")
+		b_layout.addWidget(self.summary)
 
 		self.instruments = CheckBoxGroup(rb.instrumentNames(), wsetall=True)
 		instruments, self.instrumentsb = self.mkgrp("Instrument", self.instruments)
@@ -90,6 +93,20 @@ class FilterWindow(QMainWindow):
 		layout.addWidget(sets)
 		self.setCentralWidget(container)
 
+		# preview once after a burst of changes, as "All" makes
+		self.previewtimer = QTimer(self)
+		self.previewtimer.setSingleShot(True)
+		self.previewtimer.setInterval(100)
+		self.previewtimer.timeout.connect(self.preview)
+		for g in (self.instruments, self.setups, self.features, self.nfeatures,
+				self.dirs, self.results, self.wdays, self.hours):
+			g.model.itemChanged.connect(self.previewtimer.start)
+		for b in (self.instrumentsb, self.setupsb, self.wdaysb, self.hoursb):
+			b.toggled.connect(self.previewtimer.start)
+		self.b_since.dateChanged.connect(self.previewtimer.start)
+		self.b_until.dateChanged.connect(self.previewtimer.start)
+		self.preview()
+
 	def refreshInstruments(self):
 		self.instruments.set_items(self.rb.instrumentNames())
 	def refreshFeatures(self):
@@ -181,5 +198,20 @@ class FilterWindow(QMainWindow):
 		flt = self.getFilter()
 		self.setfn(flt)
 
+	def preview(self):
+		"""show what the filter selects out of the trades loaded,
+		from the roadbook cube"""
+		flt = self.getFilter()
+		if not StatsCube.covers(flt):
+			self.summary.setText("")
+			return
+		t = cubefor(self.rb).slice(flt).totals(self.rb.account, StatUnit.Euros)
+		txt = f"{t.ntrades} trades Δ{t.total:+.0f}€ "
+		txt += f"{t.nok} OK {t.okpcent:.0f}% {t.nko} KO {t.kopcent:.0f}%"
+		since = self.rb.loadedsince()
+		if since is not None:
+			txt += f" since {since}"
+		self.summary.setText(txt)
+
 	def nofilter(self):
 		self.setfn(None)
@@ -123,6 +123,13 @@ class ObjectTableModel(QAbstractTableModel):
 			except:
 				pass
 		setattr(obj, field.name, converted)
+		if hasattr(obj, 'inval'):
+			obj.inval()
+		if hasattr(self.obj0, 'updated'):
+			try:
+				self.obj0.updated(obj)
+			except:
+				pass
 		if hasattr(self.obj0, 'dirtied'):
 			try:
 				self.obj0.dirtied()
@@ -189,11 +196,15 @@ class ObjectTableModel(QAbstractTableModel):
 		if hasattr(o, "edit") and callable(o.edit):
 			o.edit(t, filepath)
 			if t.checkOut() is None:
+				if hasattr(o, "rowfor") and callable(o.rowfor):
+					# objects are kept sorted, the owner knows where it goes
+					row = o.rowfor(self.objects, t)
 				self.insertRows(row, trade=t)
 			if hasattr(o, "edited") and callable(o.edited):
 				o.edited()
-			return
+			return row
 		self.insertRows(row)
+		return row
 
 
 	def editRow(self, row):
@@ -226,6 +237,22 @@ class ObjectTableModel(QAbstractTableModel):
 		bottomRight = self.index(len(objects)-1, len(self.field_defs)-1)
 		self.dataChanged.emit(topLeft, bottomRight)
 
+	def applyrows(self, ops):
+		"""apply row edits, as made by diffrows in data.py"""
+		last = len(self.field_defs)-1
+		for op, i, x in ops:
+			if op == "update":
+				self.objects[i] = x
+				self.dataChanged.emit(self.index(i, 0), self.index(i, last))
+			elif op == "remove":
+				self.beginRemoveRows(QModelIndex(), i, i + x - 1)
+				del self.objects[i:i+x]
+				self.endRemoveRows()
+			else:
+				self.beginInsertRows(QModelIndex(), i, i + len(x) - 1)
+				self.objects[i:i] = x
+				self.endInsertRows()
+
 	def refresh(self):
 		objects = self.objects
 		topLeft = self.index(0,0)
@@ -444,7 +471,28 @@ class ObjectTable(QWidget):
 #		self.customContextMenuRequested.connect(self.openmenu)
 
 #		self.view.doubleClicked.connect(self.clicked2)
-		self.model.rowsInserted.connect(lambda: QTimer.singleShot(0, self.view.scrollToBottom))
+		self.fetching = False
+		self.model.rowsInserted.connect(self.inserted)
+		if hasattr(obj, "fetcholder"):
+			self.view.verticalScrollBar().valueChanged.connect(self.scrolled)
+
+	def inserted(self):
+		if not self.fetching:
+			QTimer.singleShot(0, self.view.scrollToBottom)
+
+	def scrolled(self, v):
+		"""rows before the first are fetched when scrolling to the top"""
+		if v != self.view.verticalScrollBar().minimum() or self.fetching:
+			return
+		self.fetching = True
+		try:
+			n = self.obj0.fetcholder()
+		finally:
+			self.fetching = False
+		if n > 0:
+			self.view.scrollTo(self.model.index(n, 0), QTableView.ScrollHint.PositionAtTop)
+			if self.infolabel is not None:
+				self.infolabel.setText(self.obj0.info())
 
 	def keypress(self, event):
 		if event.key() == Qt.Key_End:
@@ -495,7 +543,7 @@ class ObjectTable(QWidget):
 
 	def add_row(self, filepath=None):
 		row = self.model.rowCount()
-		self.model.newRow(row, filepath)
+		row = self.model.newRow(row, filepath)
 		self.view.selectRow(row)
 
 	def delete_row(self):
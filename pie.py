@@ -23,16 +23,12 @@ class PieWidget(QWidget):
 		self._chart.legend().hide()
 		self._labels = labels
 		self._vals = vals
+		self._colors = colors
 
 		# --- Series ---
 		self._series = QPieSeries()
 		self._series.setHoleSize(0.3)
-		for i, lbl in enumerate(labels):
-			sl = self._series.append(lbl, vals[i])
-			sl.setLabelVisible()
-			sl.setLabel(f"{vals[i]:.0f} {lbl}")
-			if colors is not None:
-				sl.setColor(colors[i])
+		self._fill()
 		self._chart.addSeries(self._series)
 		self._series.setLabelsVisible(True)
 
@@ -57,5 +53,13 @@ class PieWidget(QWidget):
 		self._labels = labels
 		self._vals = vals
 		self._series.clear()
-		for i, lbl in enumerate(labels):
-			self._series.append(lbl, vals[i])
+		self._fill()
+		self._series.setLabelsVisible(True)
+
+	def _fill(self):
+		for i, lbl in enumerate(self._labels):
+			sl = self._series.append(lbl, self._vals[i])
+			sl.setLabelVisible()
+			sl.setLabel(f"{self._vals[i]:.0f} {lbl}")
+			if self._colors is not None:
+				sl.setColor(self._colors[i])
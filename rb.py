@@ -4,6 +4,7 @@ from datawin import *
 from data import *
 from PySide6.QtWidgets import QApplication
 from PySide6.QtCore import QLoggingCategory, QStandardPaths
+import multiprocessing
 #
 # roadbook using qt & python; take 2
 #
@@ -36,7 +37,8 @@ def locaterbs():
 
 if __name__ == "__main__":
 
-
+	# for process pools in frozen executables, see csv_mapper
+	multiprocessing.freeze_support()
 	QLoggingCategory.setFilterRules(".")
 	app = QApplication(sys.argv)
 	rbs = locaterbs()
@@ -53,5 +55,7 @@ if __name__ == "__main__":
 	if p is not None:
 		rb = RoadBook()
 		rb.load(p)
+		if rb.loadtimes:
+			print(f"loaded {p}: {rb.loadreport()}", file=sys.stderr)
 		win.changedata(rb)
 	sys.exit(app.exec())
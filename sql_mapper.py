@@ -0,0 +1,170 @@
+#
+# dataclass <-> sqlite tables, as csv_mapper does for CSV files.
+# Values are decoded by csv_mapper from their text, so
+# loading from a table is the same as loading from a CSV file.
+#
+import sqlite3
+from datetime import date, time
+from enum import Enum
+from typing import List, Tuple, Type
+
+from csv_mapper import (
+	SET_SEPARATOR, get_field_types, is_optional, unwrap_optional,
+	is_string_set, compile_decoder, row_dict
+)
+
+ROWCOL = "row"
+
+
+def sql_type(t) -> str:
+	if is_optional(t):
+		t = unwrap_optional(t)
+	if t is bool or t is int:
+		return "INTEGER"
+	if t is float:
+		return "REAL"
+	return "TEXT"
+
+
+def sql_value(value):
+	if value is None:
+		return None
+	if isinstance(value, bool):
+		return int(value)
+	if isinstance(value, Enum):
+		return value.name
+	if isinstance(value, (int, float)):
+		return value
+	if isinstance(value, (date, time)):
+		return value.isoformat()
+	if isinstance(value, list):
+		return SET_SEPARATOR.join(value)
+	return str(value)
+
+
+def text_value(value) -> str:
+	"""a value read from a table, as it would be in a CSV file"""
+	if value is None:
+		return ""
+	return str(value)
+
+
+def link_table(table: str, name: str) -> str:
+	"""table for the elements of set field name"""
+	return f"{table}_{name}"
+
+
+def sql_fields(cls: Type, skip: set[str] = None) -> tuple[list, list]:
+	"""(columns, set fields) for cls; columns are (name, type)"""
+	if skip is None:
+		skip = set([])
+	cols = []
+	sets = []
+	for name, t in get_field_types(cls).items():
+		if name in skip:
+			continue
+		ft = unwrap_optional(t) if is_optional(t) else t
+		if is_string_set(ft):
+			sets.append(name)
+		else:
+			cols.append((name, sql_type(t)))
+	return cols, sets
+
+
+def create_table(
+	db: sqlite3.Connection,
+	table: str,
+	cls: Type,
+	skip: set[str] = None,
+	indexes: list[str] = None
+) -> None:
+	"""(re)create the table for cls, and the link tables for its sets.
+	indexes are names of fields to index.
+	"""
+	cols, sets = sql_fields(cls, skip)
+	db.execute(f'DROP TABLE IF EXISTS "{table}"')
+	decl = ", ".join(f'"{n}" {t}' for n, t in cols)
+	db.execute(f'CREATE TABLE "{table}" ("{ROWCOL}" INTEGER PRIMARY KEY, {decl})')
+	for n in sets:
+		lt = link_table(table, n)
+		db.execute(f'DROP TABLE IF EXISTS "{lt}"')
+		db.execute(f'CREATE TABLE "{lt}" ("{ROWCOL}" INTEGER, value TEXT)')
+		db.execute(f'CREATE INDEX "{lt}_{ROWCOL}" ON "{lt}" ("{ROWCOL}")')
+	for n in indexes or ():
+		if n in sets:
+			lt = link_table(table, n)
+			db.execute(f'CREATE INDEX "{lt}_value" ON "{lt}" (value)')
+		else:
+			db.execute(f'CREATE INDEX "{table}_{n}" ON "{table}" ("{n}")')
+
+
+def write_objects_to_sql(
+	db: sqlite3.Connection,
+	table: str,
+	objects: List[object],
+	cls: Type,
+	skip: set[str] = None,
+	indexes: list[str] = None
+) -> None:
+	"""replace the table contents with objects, kept in order"""
+	cols, sets = sql_fields(cls, skip)
+	create_table(db, table, cls, skip, indexes)
+	names = [n for n, _ in cols]
+	qcols = ", ".join(f'"{n}"' for n in [ROWCOL] + names)
+	marks = ", ".join("?" * (len(names)+1))
+	db.executemany(f'INSERT INTO "{table}" ({qcols}) VALUES ({marks})',
+		([i] + [sql_value(getattr(o, n)) for n in names]
+			for i, o in enumerate(objects)))
+	for n in sets:
+		lt = link_table(table, n)
+		db.executemany(f'INSERT INTO "{lt}" ("{ROWCOL}", value) VALUES (?, ?)',
+			((i, v) for i, o in enumerate(objects)
+				for v in sorted(getattr(o, n) or ())))
+
+
+def has_table(db: sqlite3.Connection, table: str) -> bool:
+	r = db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+		(table,)).fetchone()
+	return r is not None
+
+
+def load_objects_from_sql(
+	db: sqlite3.Connection,
+	table: str,
+	cls: Type,
+	skip: set[str] = None
+) -> Tuple[List[object], List[dict]]:
+	"""
+	Returns (objects, errors) as load_objects_from_csv does;
+	the row in errors is the row in the table.
+	"""
+	objects = []
+	errors = []
+	if not has_table(db, table):
+		return objects, errors
+	cols, sets = sql_fields(cls, skip)
+	names = [n for n, _ in cols]
+	elems = {}
+	for n in sets:
+		lt = link_table(table, n)
+		els = {}
+		for r, v in db.execute(f'SELECT "{ROWCOL}", value FROM "{lt}" ORDER BY rowid'):
+			els.setdefault(r, []).append(v)
+		elems[n] = els
+	header = names + sets
+	decode = compile_decoder(cls, header)
+	qcols = ", ".join(f'"{n}"' for n in [ROWCOL] + names)
+	for r in db.execute(f'SELECT {qcols} FROM "{table}" ORDER BY "{ROWCOL}"'):
+		row = [text_value(v) for v in r[1:]]
+		for n in sets:
+			row.append(SET_SEPARATOR.join(elems[n].get(r[0], ())))
+		kwargs, row_errors = decode(row)
+		if row_errors:
+			errors.append({
+				"row": r[0],
+				"errors": row_errors,
+				"data": row_dict(header, row)
+			})
+		else:
+			objects.append(cls(**kwargs))
+	return objects, errors
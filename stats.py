@@ -1,5 +1,6 @@
 
 from enum import Enum, IntEnum, IntFlag, auto
+from datetime import timedelta
 from data import *
 
 class StatKind(IntFlag):
@@ -52,6 +53,9 @@ class Filter:
 	until: date = None
 
 	def apply(self, trades: list[Trade]) -> list[Trade]:
+		"""trades matching the filter, out of a list sorted by date"""
+		if self.since is not None and self.until is not None and self.since < self.until:
+			trades = dateslice(trades, self.since, self.until)
 		for mh in self.musthave:
 			trades = [t for t in trades if t.hasfeature(mh)]
 		for mh in self.canthave:
@@ -68,39 +72,52 @@ class Filter:
 			trades = [t for t in trades if t.hour() in self.hours]
 		if len(self.wdays) > 0:
 			trades = [t for t in trades if t.dayofweek() in self.wdays]
-		if self.since is not None and self.until is not None and self.since < self.until:
-			trades = [t for t in trades if self.since <= t.datein <= self.until]
 		return trades
 
+	def key(self) -> tuple:
+		"""hashable value, equal for filters selecting the same"""
+		if self.since is not None and self.until is not None and self.since < self.until:
+			dates = (self.since, self.until)
+		else:
+			dates = None
+		return (frozenset(self.musthave), frozenset(self.canthave),
+			frozenset(self.instruments), frozenset(self.setups),
+			frozenset(self.dirs), frozenset(self.results),
+			frozenset(self.hours), frozenset(self.wdays), dates)
+
+	# the ones below expect trades sorted by date,
+	# and are relative to the last one.
+
 	@staticmethod
 	def thisday(trades: list[Trade]) -> list[Trade]:
 		if len(trades) == 0:
 			return trades
 		d = trades[-1].datein
-		return [t for t in trades if t.datein == d]
+		return dateslice(trades, d)
 
 	@staticmethod
 	def thisweek(trades: list[Trade]) -> list[Trade]:
 		if len(trades) == 0:
 			return trades
-		y = trades[-1].year()
-		w = trades[-1].week()
-		return [t for t in trades if t.year() == y and t.week() == w]
+		d = trades[-1].datein
+		since = d - timedelta(days=d.weekday())
+		if since.year != d.year:
+			since = date(d.year, 1, 1)
+		return dateslice(trades, since)
 
 	@staticmethod
 	def thismonth(trades: list[Trade]) -> list[Trade]:
 		if len(trades) == 0:
 			return trades
-		y = trades[-1].year()
-		m = trades[-1].month()
-		return [t for t in trades if t.year() == y and t.month() == m]
+		d = trades[-1].datein
+		return dateslice(trades, date(d.year, d.month, 1))
 
 	@staticmethod
 	def thisyear(trades: list[Trade]) -> list[Trade]:
 		if len(trades) == 0:
 			return trades
-		y = trades[-1].year()
-		return [t for t in trades if t.year() == y]
+		d = trades[-1].datein
+		return dateslice(trades, date(d.year, 1, 1))
 
 def tradevalue(t: Trade, u: StatUnit, tots=False) -> float:
 	if t is None:
@@ -161,6 +178,32 @@ class StatTotals:
 			else:
 				self.nneutral += 1
 				self.totalneutral += v
+		self.derive(acc)
+
+	@staticmethod
+	def running(acc, bucket: dict) -> "StatTotals":
+		"""totals in euros for a data.TradeTotals bucket"""
+		st = StatTotals(acc, [])
+		for r in (Result.OK, Result.KO, Result.Neutral):
+			x = bucket.get(r)
+			if x is not None:
+				st.addresult(r, x[0], x[1])
+				st.ntrades += x[0]
+				st.total += x[1]
+		st.derive(acc)
+		return st
+
+	def addresult(self, r: Result, n: int, total: float) -> None:
+		"""count and total for trades with result r"""
+		if r == Result.OK:
+			self.nok, self.totalok = n, total
+		elif r == Result.KO:
+			self.nko, self.totalko = n, total
+		else:
+			self.nneutral, self.totalneutral = n, total
+
+	def derive(self, acc) -> None:
+		"""averages and percents out of the totals and counts"""
 		self.average = self.total / self.ntrades if self.ntrades>0 else 0
 		self.averageok = self.totalok / self.nok if self.nok >0 else 0
 		self.averageko = self.totalko / self.nko if self.nko>0 else 0
@@ -219,6 +262,9 @@ def perfunc(ts: list[Trade],
 		vals.append(val)
 		labels.append(lastlabel)
 		cnts.append(cnt)
+	return perkind(labels, vals, cnts, k, nb)
+
+def perkind(labels, vals, cnts, k: StatKind, nb=None) -> tuple[list[str],list[float]]:
 	if k == StatKind.Cnt:
 		if nb and len(cnts) > nb:
 			labels = labels[-nb:]
@@ -233,17 +279,91 @@ def perfunc(ts: list[Trade],
 		vals = vals[-nb:]
 	return labels, vals
 
+def sqlgroups(ts: list[Trade], key: str, u: StatUnit):
+	"""(label, total, count) for ts computed by the sqlite backend, or None"""
+	if len(ts) == 0 or ts[0].rb is None:
+		return None
+	return ts[0].rb.sqlgroups(ts, key, u.name)
+
+def sqlperfunc(ts: list[Trade], key: str, u: StatUnit, k: StatKind, nb=None):
+	groups = sqlgroups(ts, key, u)
+	if groups is None:
+		return None
+	labels = [str(g[0]) for g in groups]
+	vals = [g[1] for g in groups]
+	cnts = [g[2] for g in groups]
+	return perkind(labels, vals, cnts, k, nb)
+
+def sqlperfield(ts: list[Trade], key: str, u: StatUnit, k: StatKind, fn=None):
+	groups = sqlgroups(ts, key, u)
+	if groups is None:
+		return None
+	vdict = {}
+	vcnt = {}
+	for g in groups:
+		nm = (fn(g[0]) if fn else g[0]) or "none"
+		vdict[nm] = vdict.get(nm, 0) + g[1]
+		vcnt[nm] = vcnt.get(nm, 0) + g[2]
+	return forkind(sorted(vdict), vdict, vcnt, k)
+
+# labels for sqlperfield groups, when not those of the per...() functions
+SQLLABELS = {
+	"result": lambda x: Result(x).name,
+	"wday": lambda x: WDay(x).name,
+}
+
+def sqlper(ts: list[Trade], key: str, u: StatUnit, k: StatKind, nb=None):
+	"""as StatsEngine.per, computed by the sqlite backend, or None"""
+	if key in ORDEREDKEYS:
+		return sqlperfunc(ts, key, u, k, nb)
+	return sqlperfield(ts, key, u, k, SQLLABELS.get(key))
+
+class SqlStats:
+	"""per() for trades, grouped by the sqlite backend when it
+	can (see RoadBook.sqlgroups), else by the engine from mkengine()
+	"""
+	def __init__(self, trades: list[Trade], mkengine):
+		self.trades = trades
+		self.mkengine = mkengine
+
+	def per(self, key: str, u: StatUnit, k: StatKind, nb=None) -> tuple[list[str],list[float]]:
+		r = sqlper(self.trades, key, u, k, nb)
+		if r is None:
+			return self.mkengine().per(key, u, k, nb)
+		return r
+
+# labels for the trades grouped by a key. Ordered keys group runs of
+# trades in date order (see perfunc), the others group all trades
+# with the same label (see perfield).
+ORDEREDKEYS = {
+	"day": lambda t: t.datein.isoformat() if t.datein else "none",
+	"week": lambda t: f"{t.year()}-{t.week()}" if t.datein else "none",
+	"month": lambda t: f"{t.year()}-{t.month()}" if t.datein else "none",
+}
+FIELDKEYS = {
+	"result": lambda t: t.result().name,
+	"hour": lambda t: f"{t.hour():02d}",
+	"wday": lambda t: t.dayofweek().name,
+	"setup": lambda t: t.setup,
+	"instrument": lambda t: t.instrument,
+}
+# keys whose labels depend only on the trade date
+DATEKEYS = {"day", "week", "month", "wday"}
+
 def perday(ts: list[Trade], u: StatUnit, k: StatKind, nb=None) -> tuple[list[str],list[float]]:
-	fn = lambda t: t.datein.isoformat() if t.datein else "none"
-	return perfunc(ts, u, k, fn, nb)
+	r = sqlperfunc(ts, "day", u, k, nb)
+	if r is not None:
+		return r
+	return perfunc(ts, u, k, ORDEREDKEYS["day"], nb)
 
 def perweek(ts: list[Trade], u: StatUnit, k: StatKind, nb=None) -> tuple[list[str],list[float]]:
-	fn = lambda t: f"{t.year()}-{t.week()}" if t.datein else "none"
-	return perfunc(ts, u, k, fn, nb)
+	return perfunc(ts, u, k, ORDEREDKEYS["week"], nb)
 
 def permonth(ts: list[Trade], u: StatUnit, k: StatKind, nb=None) -> tuple[list[str],list[float]]:
-	fn = lambda t: f"{t.year()}-{t.month()}" if t.datein else "none"
-	return perfunc(ts, u, k, fn, nb)
+	r = sqlperfunc(ts, "month", u, k, nb)
+	if r is not None:
+		return r
+	return perfunc(ts, u, k, ORDEREDKEYS["month"], nb)
 
 
 
@@ -259,18 +379,465 @@ def perfield(ts: list[Trade], u: StatUnit, k: StatKind, fn) -> tuple[list[str],l
 	return forkind(iset, vdict, vcnt, k)
 
 def perresult(ts: list[Trade], u: StatUnit, k: StatKind, nb = 0) -> tuple[list[str],list[float]]:
-	return perfield(ts, u, k, lambda t: t.result().name)
+	r = sqlperfield(ts, "result", u, k, SQLLABELS["result"])
+	if r is not None:
+		return r
+	return perfield(ts, u, k, FIELDKEYS["result"])
+
+def runningresults(bucket: dict, k: StatKind) -> tuple[list[str],list[float]]:
+	"""as perresult in euros, for a data.TradeTotals bucket"""
+	iset = sorted(r.name for r in bucket)
+	vdict = {r.name: x[1] for r, x in bucket.items()}
+	vcnt = {r.name: x[0] for r, x in bucket.items()}
+	return forkind(iset, vdict, vcnt, k)
 
 def perhour(ts: list[Trade], u: StatUnit, k: StatKind, nb = 0) -> tuple[list[str],list[float]]:
-	return perfield(ts, u, k, lambda t: f"{t.hour():02d}")
+	r = sqlperfield(ts, "hour", u, k)
+	if r is not None:
+		return r
+	return perfield(ts, u, k, FIELDKEYS["hour"])
 
 
 def perdayofweek(ts: list[Trade], u: StatUnit, k: StatKind, nb = 0) -> tuple[list[str],list[float]]:
-	return perfield(ts, u, k, lambda t: t.dayofweek().name)
+	r = sqlperfield(ts, "wday", u, k, SQLLABELS["wday"])
+	if r is not None:
+		return r
+	return perfield(ts, u, k, FIELDKEYS["wday"])
 
 
 def persetup(ts: list[Trade], u: StatUnit, k: StatKind, nb = 0) -> tuple[list[str],list[float]]:
-	return perfield(ts, u, k, lambda t: t.setup)
+	r = sqlperfield(ts, "setup", u, k)
+	if r is not None:
+		return r
+	return perfield(ts, u, k, FIELDKEYS["setup"])
 
 def perinstrument(ts: list[Trade], u: StatUnit, k: StatKind, nb = 0) -> tuple[list[str],list[float]]:
-	return perfield(ts, u, k, lambda t: t.instrument)
+	r = sqlperfield(ts, "instrument", u, k)
+	if r is not None:
+		return r
+	return perfield(ts, u, k, FIELDKEYS["instrument"])
+
+# key for the groups made by each per...() function
+PERKEYS = {
+	perday: "day",
+	perweek: "week",
+	permonth: "month",
+	perresult: "result",
+	perhour: "hour",
+	perdayofweek: "wday",
+	persetup: "setup",
+	perinstrument: "instrument",
+}
+
+class StatsEngine:
+	"""
+	stats for trades in the units given, computed in a single pass.
+	per() gives what the per...() functions would, tradevaluetots()
+	and totals() what the functions and StatTotals would, but
+	reading the results instead of going through the trades.
+	With numpy, values are kept in arrays and grouped with bincount,
+	which adds in the same order as the functions do.
+	Results are kept, the engine is for trades that do not change.
+	"""
+	def __init__(self, trades: list[Trade], units: StatUnit = StatUnit.Euros, values: dict = None):
+		self.trades = trades
+		self.units = [u for u in StatUnit if u & units]
+		if values is None:
+			values = self.tradevalues(trades)
+		# values for each unit and trade, and values counting KOs
+		# (or OKs) as -1 for Success (or Failure), see tradevalue()
+		self.values, self.totvalues = values
+		self.groups = self.mkgroups() if np is None else self.npgroups()
+		self.memo = {}
+
+	def tradevalues(self, trades) -> tuple[dict, dict]:
+		if np is not None:
+			return self.nptradevalues(trades)
+		vals = {u: [] for u in self.units}
+		tots = {u: vals[u] for u in self.units}
+		for u in self.units:
+			if u in (StatUnit.Success, StatUnit.Failure):
+				tots[u] = []
+		for t in trades:
+			for u in self.units:
+				vals[u].append(tradevalue(t, u))
+				if tots[u] is not vals[u]:
+					tots[u].append(tradevalue(t, u, tots=True))
+		return vals, tots
+
+	def nptradevalues(self, trades) -> tuple[dict, dict]:
+		n = len(trades)
+		vals = {}
+		tots = {}
+		res = None
+		for u in self.units:
+			if u in (StatUnit.Success, StatUnit.Failure):
+				if res is None:
+					res = np.fromiter((t.result() for t in trades), dtype=np.int8, count=n)
+				sign = 1 if u == StatUnit.Success else -1
+				vals[u] = (res == sign).astype(float)
+				tots[u] = (res * sign).astype(float)
+			else:
+				vals[u] = np.fromiter((tradevalue(t, u) for t in trades), dtype=float, count=n)
+				tots[u] = vals[u]
+		return vals, tots
+
+	def mkgroups(self) -> dict:
+		"""key -> list (ordered keys) or dict of [label, totals, count]"""
+		groups = {k: [] for k in ORDEREDKEYS}
+		groups.update({k: {} for k in FIELDKEYS})
+		ordered = [(groups[k], fn) for k, fn in ORDEREDKEYS.items()]
+		fielded = [(groups[k], fn) for k, fn in FIELDKEYS.items()]
+		cols = [self.values[u] for u in self.units]
+		nu = len(cols)
+		for i, t in enumerate(self.trades):
+			vs = [c[i] for c in cols]
+			accs = []
+			for runs, fn in ordered:
+				label = fn(t)
+				if not runs or runs[-1][0] != label:
+					runs.append([label, [0]*nu, 0])
+				accs.append(runs[-1])
+			for d, fn in fielded:
+				label = fn(t) or "none"
+				acc = d.get(label)
+				if acc is None:
+					acc = d[label] = [label, [0]*nu, 0]
+				accs.append(acc)
+			for acc in accs:
+				tots = acc[1]
+				for j in range(nu):
+					tots[j] += vs[j]
+				acc[2] += 1
+		return groups
+
+	def npgroups(self) -> dict:
+		"""as mkgroups, but labels are computed once per date for
+		DATEKEYS and sums are made by bincount"""
+		ts = self.trades
+		n = len(ts)
+		groups = {k: [] for k in ORDEREDKEYS}
+		groups.update({k: {} for k in FIELDKEYS})
+		if n == 0:
+			return groups
+		cols = [self.values[u] for u in self.units]
+		ords = np.fromiter((t.datein.toordinal() if t.datein else 0 for t in ts),
+			dtype=np.int64, count=n)
+		_, first, dayidx = np.unique(ords, return_index=True, return_inverse=True)
+		for k, fn in list(ORDEREDKEYS.items()) + list(FIELDKEYS.items()):
+			if k in DATEKEYS:
+				names, codes = npcodes([fn(ts[i]) for i in first])
+				codes = codes[dayidx]
+			else:
+				names, codes = npcodes([fn(t) or "none" for t in ts])
+			if k in ORDEREDKEYS:
+				starts = np.flatnonzero(codes[1:] != codes[:-1]) + 1
+				runs = np.zeros(n, dtype=np.intp)
+				runs[starts] = 1
+				runs = np.cumsum(runs)
+				names = [names[c] for c in codes[np.r_[0, starts]].tolist()]
+				codes = runs
+			tots, cnts = npsums(codes, len(names), cols)
+			accs = [[l, tots[i], cnts[i]] for i, l in enumerate(names)]
+			if k in ORDEREDKEYS:
+				groups[k] = accs
+			else:
+				groups[k] = {acc[0]: acc for acc in accs}
+		return groups
+
+	def per(self, key: str, u: StatUnit, k: StatKind, nb=None) -> tuple[list[str],list[float]]:
+		"""as the per...() function grouping by key"""
+		m = (key, u, k, nb)
+		r = self.memo.get(m)
+		if r is None:
+			r = self.memo[m] = self.mkper(key, u, k, nb)
+		return r
+
+	def mkper(self, key: str, u: StatUnit, k: StatKind, nb=None) -> tuple[list[str],list[float]]:
+		j = self.units.index(u)
+		g = self.groups[key]
+		if key in ORDEREDKEYS:
+			# perfunc skips empty labels
+			g = [acc for acc in g if acc[0]]
+			return perkind([acc[0] for acc in g], [acc[1][j] for acc in g],
+				[acc[2] for acc in g], k, nb)
+		vdict = {str(l): acc[1][j] for l, acc in g.items()}
+		vcnt = {str(l): acc[2] for l, acc in g.items()}
+		return forkind(sorted(g), vdict, vcnt, k)
+
+	def perfn(self, fn, u: StatUnit, k: StatKind, nb=None) -> tuple[list[str],list[float]]:
+		"""as fn(trades, u, k, nb), fn being one of the per...() functions"""
+		return self.per(PERKEYS[fn], u, k, nb)
+
+	def tradevaluetots(self, u: StatUnit, initial=0) -> list[float]:
+		m = ("tots", u, initial)
+		r = self.memo.get(m)
+		if r is None:
+			r = self.memo[m] = self.mktots(u, initial)
+		return r
+
+	def mktots(self, u: StatUnit, initial=0) -> list[float]:
+		vals = self.totvalues[u]
+		if np is not None:
+			return np.cumsum(np.r_[initial, vals])[1:].tolist()
+		tots = []
+		for v in vals:
+			initial += v
+			tots.append(initial)
+		return tots
+
+	def totals(self, acc, u: StatUnit) -> StatTotals:
+		"""StatTotals(acc, trades, u)"""
+		st = StatTotals(acc, [], u)
+		vals = self.values[u]
+		st.ntrades = len(vals)
+		if np is not None:
+			st.total = npsums(np.zeros(len(vals), dtype=np.intp), 1, [vals])[0][0][0]
+		else:
+			total = 0.0
+			for v in vals:
+				total += v
+			st.total = total
+		j = self.units.index(u)
+		rs = self.groups["result"]
+		for r in (Result.OK, Result.KO, Result.Neutral):
+			x = rs.get(r.name)
+			if x is not None:
+				st.addresult(r, x[2], x[1][j])
+		st.derive(acc)
+		return st
+
+	def last(self, n: int) -> "StatsEngine":
+		"""engine for the last n trades, as sliced by Filter.thisday..."""
+		m = ("last", n)
+		e = self.memo.get(m)
+		if e is None:
+			e = self.memo[m] = self.mklast(n)
+		return e
+
+	def mklast(self, n: int) -> "StatsEngine":
+		s = len(self.trades) - n
+		vals = {u: v[s:] for u, v in self.values.items()}
+		tots = {u: v[s:] for u, v in self.totvalues.items()}
+		e = StatsEngine.__new__(StatsEngine)
+		e.trades = self.trades[s:]
+		e.units = self.units
+		e.values, e.totvalues = vals, tots
+		e.groups = e.mkgroups() if np is None else e.npgroups()
+		e.memo = {}
+		return e
+
+def npcodes(labels: list) -> tuple[list, "np.ndarray"]:
+	"""distinct labels, in order, and the index in them for each label"""
+	names = list(dict.fromkeys(labels))
+	ids = {l: i for i, l in enumerate(names)}
+	codes = np.fromiter(map(ids.__getitem__, labels), dtype=np.intp, count=len(labels))
+	return names, codes
+
+def npsums(codes, n: int, cols: list) -> tuple[list, list]:
+	"""totals for each column and counts, for codes in range(n).
+	bincount adds in order, as the loops in perfunc and perfield do.
+	"""
+	cnts = np.bincount(codes, minlength=n).tolist()
+	sums = [np.bincount(codes, weights=c, minlength=n).tolist() for c in cols]
+	return [[s[i] for s in sums] for i in range(n)], cnts
+
+# StatsCube dimensions: key -> (index in cellkey(), label for values)
+CUBEKEYS = {
+	"setup": (0, lambda x: x or "none"),
+	"instrument": (1, lambda x: x or "none"),
+	"hour": (2, lambda h: f"{h:02d}"),
+	"wday": (3, lambda d: d.name if d is not None else "none"),
+	"result": (4, lambda r: r.name),
+	"dir": (5, lambda d: d.name if d is not None else "none"),
+	"month": (6, lambda m: f"{m[0]}-{m[1]}" if m is not None else "none"),
+}
+
+def cellkey(t: Trade) -> tuple:
+	"""StatsCube cell for t"""
+	d = t.datein
+	if d is None:
+		return (t.setup, t.instrument, t.hour(), None, t.result(), t.dir, None)
+	return (t.setup, t.instrument, t.hour(), t.dayofweek(), t.result(), t.dir, (d.year, d.month))
+
+def monthspan(since: date, until: date) -> tuple:
+	"""(first, last) months, as (year, month), wholly within
+	[since, until] or None, and the date ranges left out of them"""
+	first = (since.year, since.month)
+	if since.day != 1:
+		first = (first[0], first[1]+1) if first[1] < 12 else (first[0]+1, 1)
+	last = (until.year, until.month)
+	if (until + timedelta(days=1)).day != 1:
+		last = (last[0], last[1]-1) if last[1] > 1 else (last[0]-1, 12)
+	if first > last:
+		return None, [(since, until)]
+	edges = []
+	start = date(first[0], first[1], 1)
+	if since < start:
+		edges.append((since, start - timedelta(days=1)))
+	end = date(last[0]+1, 1, 1) if last[1] == 12 else date(last[0], last[1]+1, 1)
+	if end <= until:
+		edges.append((end, until))
+	return (first, last), edges
+
+class StatsCube:
+	"""
+	counts and totals in every unit for trades grouped by setup,
+	instrument, hour, weekday, result, direction and month, to
+	slice by filters and roll up without going through trades.
+	Cells are kept in columns, as TradeStore does for trades: a
+	code per dimension, the count and the totals per unit.
+	Filters with features are not covered. For dates, only trades
+	in months partly within the dates are gone through.
+	"""
+	def __init__(self, trades: list[Trade], units: list[StatUnit] = None):
+		self.trades = trades
+		self.units = list(StatUnit) if units is None else units
+		ndims = len(CUBEKEYS)
+		self.values = [[] for _ in range(ndims)]
+		self.codes = [array("i") for _ in range(ndims)]
+		self.counts = array("q")
+		self.sums = [array("d") for _ in self.units]
+		cells = {}
+		ids = [{} for _ in range(ndims)]
+		for t in trades:
+			k = cellkey(t)
+			r = cells.get(k)
+			if r is None:
+				r = cells[k] = len(self.counts)
+				for i, v in enumerate(k):
+					c = ids[i].get(v)
+					if c is None:
+						c = ids[i][v] = len(self.values[i])
+						self.values[i].append(v)
+					self.codes[i].append(c)
+				self.counts.append(0)
+				for s in self.sums:
+					s.append(0.0)
+			self.counts[r] += 1
+			for j, u in enumerate(self.units):
+				self.sums[j][r] += tradevalue(t, u)
+		# (cube, rows) whose cells are in this one, rows None for all
+		self.parts = [(self, None)]
+
+	@staticmethod
+	def covers(flt: Filter) -> bool:
+		return len(flt.musthave) == 0 and len(flt.canthave) == 0
+
+	def slice(self, flt: Filter) -> "StatsCube":
+		"""cube for the trades flt selects, out of the cube for all"""
+		conds = [(i, s) for i, s in enumerate((flt.setups, flt.instruments,
+			flt.hours, flt.wdays, flt.results, flt.dirs)) if len(s) > 0]
+		edges = []
+		if flt.since is not None and flt.until is not None and flt.since < flt.until:
+			months, edges = monthspan(flt.since, flt.until)
+			if months is None:
+				conds.append((CUBEKEYS["month"][0], ()))
+			else:
+				m = CUBEKEYS["month"][0]
+				conds.append((m, {v for v in self.values[m]
+					if v is not None and months[0] <= v <= months[1]}))
+		codes = [(self.codes[i], {c for c, v in enumerate(self.values[i]) if v in s})
+			for i, s in conds]
+		if np is not None:
+			rows = self.npselect(codes)
+		else:
+			rows = self.pyselect(codes)
+		c = StatsCube.__new__(StatsCube)
+		c.trades = self.trades
+		c.units = self.units
+		c.parts = [(self, rows)]
+		for since, until in edges:
+			ts = flt.apply(dateslice(self.trades, since, until))
+			if len(ts) > 0:
+				c.parts.append((StatsCube(ts, self.units), None))
+		return c
+
+	def pyselect(self, codes: list) -> list[int]:
+		rows = range(len(self.counts))
+		for col, cs in codes:
+			rows = [r for r in rows if col[r] in cs]
+		return list(rows)
+
+	def npselect(self, codes: list) -> "np.ndarray":
+		ok = np.ones(len(self.counts), dtype=bool)
+		for col, cs in codes:
+			c = np.frombuffer(col, dtype=np.int32)
+			ok &= np.isin(c, list(cs))
+		return np.flatnonzero(ok)
+
+	def rollup(self, i: int, j: int) -> tuple[dict, dict]:
+		"""totals in unit j and counts by the values of dimension i"""
+		vdict = {}
+		vcnt = {}
+		for c, rows in self.parts:
+			if np is not None:
+				sums, cnts = c.nprollup(i, j, rows)
+			else:
+				sums, cnts = c.pyrollup(i, j, rows)
+			for code, n in enumerate(cnts):
+				if n == 0:
+					continue
+				v = c.values[i][code]
+				vdict[v] = vdict.get(v, 0) + sums[code]
+				vcnt[v] = vcnt.get(v, 0) + n
+		return vdict, vcnt
+
+	def pyrollup(self, i: int, j: int, rows) -> tuple[list, list]:
+		nv = len(self.values[i])
+		sums = [0]*nv
+		cnts = [0]*nv
+		col = self.codes[i]
+		s = self.sums[j]
+		for r in range(len(self.counts)) if rows is None else rows:
+			sums[col[r]] += s[r]
+			cnts[col[r]] += self.counts[r]
+		return sums, cnts
+
+	def nprollup(self, i: int, j: int, rows) -> tuple[list, list]:
+		nv = len(self.values[i])
+		col = np.frombuffer(self.codes[i], dtype=np.int32)
+		s = np.frombuffer(self.sums[j], dtype=float)
+		n = np.frombuffer(self.counts, dtype=np.int64)
+		if rows is not None:
+			col, s, n = col[rows], s[rows], n[rows]
+		sums = np.bincount(col, weights=s, minlength=nv).tolist()
+		cnts = np.bincount(col, weights=n, minlength=nv).astype(np.int64).tolist()
+		return sums, cnts
+
+	def ntrades(self) -> int:
+		return sum(self.rollup(0, 0)[1].values())
+
+	def per(self, key: str, u: StatUnit, k: StatKind, nb=None) -> tuple[list[str],list[float]]:
+		"""as StatsEngine.per, for keys in CUBEKEYS"""
+		i, label = CUBEKEYS[key]
+		vdict, vcnt = self.rollup(i, self.units.index(u))
+		if key == "month":
+			ms = sorted(vdict, key=lambda m: (m is not None, m))
+			return perkind([label(m) for m in ms], [vdict[m] for m in ms],
+				[vcnt[m] for m in ms], k, nb)
+		ldict = {}
+		lcnt = {}
+		for v in vdict:
+			l = label(v)
+			ldict[l] = ldict.get(l, 0) + vdict[v]
+			lcnt[l] = lcnt.get(l, 0) + vcnt[v]
+		return forkind(sorted(ldict), ldict, lcnt, k)
+
+	def totals(self, acc, u: StatUnit) -> StatTotals:
+		"""as StatTotals(acc, trades, u)"""
+		st = StatTotals(acc, [], u)
+		vdict, vcnt = self.rollup(CUBEKEYS["result"][0], self.units.index(u))
+		for r in (Result.OK, Result.KO, Result.Neutral):
+			if r in vcnt:
+				st.addresult(r, vcnt[r], vdict[r])
+				st.ntrades += vcnt[r]
+				st.total += vdict[r]
+		st.derive(acc)
+		return st
+
+def cubefor(rb) -> StatsCube:
+	"""cube for the trades loaded in rb, kept until they change"""
+	if rb.cube is None or rb.cube[0] != rb.generation:
+		rb.cube = (rb.generation, StatsCube(rb.trades))
+	return rb.cube[1]
@@ -15,11 +15,20 @@ from bar import XYBarWidget
 from stackbar import XYStackBarWidget
 from pie import PieWidget
 
+# engines kept by StatsWindow, for the last filters and units used
+NENGINES = 4
+
 class StatsWindow(QMainWindow):
 	def __init__(self, rb, parent=None):
 		super().__init__(parent)
 		self.rb = rb
 		self.unit = StatUnit.Euros
+		self.engine = None
+		self.units = self.unit
+		# cube slice for the filter, see mkslice()
+		self.slice = None
+		# engines by (trades generation, filter, units), see mkengine()
+		self.engines = {}
 		self.setWindowTitle("Stats")
 		self.plotxsize = 600
 		self.plotysize = 400
@@ -102,10 +111,60 @@ class StatsWindow(QMainWindow):
 			b.setChecked(True)
 		self.plotchanged()
 
-	def mkplot(self, k, u, p, fn=lambda x: x, factorx=1.0, factory=1.0):
-		trades = self.rb.filteredtrades or self.rb.trades
-		trades = fn(trades)
-		y = tradevaluetots(trades, u)
+	def stats(self, flt=None) -> StatsEngine:
+		"""engine for the trades shown, or for those flt leaves"""
+		if self.engine is None:
+			self.engine = self.mkengine(self.units)
+		if flt is None:
+			return self.engine
+		return self.engine.last(len(flt(self.engine.trades)))
+
+	def grouped(self, key: str):
+		"""where to read stats grouped by key: the database when the
+		roadbook is kept there and saved, the cube slice if there is
+		one for the filter and it has key, else the engine"""
+		rb = self.rb
+		if rb.sqlclean():
+			return SqlStats(rb.filteredtrades or rb.trades, self.stats)
+		if self.slice is not None and key in CUBEKEYS:
+			return self.slice
+		return self.stats()
+
+	def mkslice(self) -> StatsCube:
+		"""slice of the roadbook cube for the filter, or None"""
+		rb = self.rb
+		if rb.filteredtrades is None:
+			return None
+		# after trades change the list shown may no longer match the
+		# filter: stats come then from the list, as the table and info
+		flt = rb.lastfiltered(rb.filteredtrades)
+		if flt is None or not StatsCube.covers(flt):
+			return None
+		return cubefor(rb).slice(flt)
+
+	def mkengine(self, units) -> StatsEngine:
+		"""engine for the trades shown, reused while they do not
+		change, so repaints and going back to a unit compute nothing"""
+		rb = self.rb
+		flt = None
+		if rb.filteredtrades is not None:
+			if rb.lastfilter is None or rb.lastfilter[1] is not rb.filteredtrades:
+				return StatsEngine(rb.filteredtrades or rb.trades, units)
+			flt = rb.lastfilter[0].key()
+		key = (rb.generation, flt, units)
+		e = self.engines.pop(key, None)
+		if e is None:
+			e = StatsEngine(rb.filteredtrades or rb.trades, units)
+		self.engines[key] = e
+		for k in [k for k in self.engines if k[0] != rb.generation]:
+			# trades changed since
+			del self.engines[k]
+		while len(self.engines) > NENGINES:
+			del self.engines[next(iter(self.engines))]
+		return e
+
+	def mkplot(self, k, u, p, flt=None, factorx=1.0, factory=1.0):
+		y = self.stats(flt).tradevaluetots(u)
 		x = range(len(y))
 		x = [str(a) for a in x]
 		plot = XYPlotWidget(f"{k.name} {u.name} {p.name}")
@@ -114,10 +173,9 @@ class StatsWindow(QMainWindow):
 		return plot
 
 	def mkokpie(self, k, u, nb=None, factor=1.0):
-		trades = self.rb.filteredtrades or self.rb.trades
 		if u in [StatUnit.Success, StatUnit.Failure]:
 			u = StatUnit.Pts
-		x, yok = perresult(trades, u, k, nb)
+		x, yok = self.grouped("result").per("result", u, k, nb)
 		res = {x[i]: yok[i] for i in range(len(x))}
 		if not "OK" in res:
 			res["OK"] = 0
@@ -138,10 +196,10 @@ class StatsWindow(QMainWindow):
 		return plot
 
 	def mkgraph(self, k, u, p, fn, nb=None):
-		trades = self.rb.filteredtrades or self.rb.trades
 		if p == StatPlot.PerResult:
 			return self.mkokpie(k, u, nb=nb)
-		x, y = fn(trades, u, k, nb)
+		key = PERKEYS[fn]
+		x, y = self.grouped(key).per(key, u, k, nb)
 		plot = XYBarWidget(StatsWindow.mktitle(k, u, p))
 		plot.set_data(x, y)
 		f = 1
@@ -158,9 +216,9 @@ class StatsWindow(QMainWindow):
 		return title.replace("Per", "per ")
 
 	def mkokgraph(self, k, u, p, fn, nb=None):
-		trades = self.rb.filteredtrades or self.rb.trades
-		x, yok = fn(trades, StatUnit.Success, k, nb)
-		x2, yko = fn(trades, StatUnit.Failure, k, nb)
+		key = PERKEYS[fn]
+		x, yok = self.grouped(key).per(key, StatUnit.Success, k, nb)
+		x2, yko = self.grouped(key).per(key, StatUnit.Failure, k, nb)
 		plot = XYStackBarWidget(["KO", "OK"], StatsWindow.mktitle(k, u, p),
 			colors = ["red", "green"])
 		plot.set_data(x, [yko, yok])
@@ -170,12 +228,26 @@ class StatsWindow(QMainWindow):
 		plot.setFixedSize(self.plotxsize*f,self.plotysize)
 		return plot
 
-	def todayokpie(rb, k, u, p, flt=Filter.thisday, nb=None):
-		trades = rb.filteredtrades or rb.trades
-		trades = flt(trades)
+	def todayokpie(rb, k, u, p, flt=Filter.thisday, nb=None, engine=None):
+		vals, title = StatsWindow.todayokvals(rb, k, u, p, flt, nb, engine)
+		plot = PieWidget(["OK", "Neut", "KO"], vals, title,
+			colors=["green", "grey", "red"])
+		return plot
+
+	@staticmethod
+	def todayokvals(rb, k, u, p, flt=Filter.thisday, nb=None, engine=None):
+		"""OK, Neutral and KO values and title for todayokpie"""
 		if u == StatUnit.Success or u == StatUnit.Failure:
 			u = StatUnit.Pts
-		x, yok = perresult(trades, u, k, nb)
+		if engine is None and rb.filteredtrades is None and \
+				flt is Filter.thisday and u == StatUnit.Euros:
+			# the roadbook keeps these up to date
+			x, yok = runningresults(rb.running().day(), k)
+		else:
+			if engine is None:
+				trades = rb.filteredtrades or rb.trades
+				engine = StatsEngine(flt(trades), u)
+			x, yok = engine.per("result", u, k, nb)
 		res = {x[i]: yok[i] for i in range(len(x))}
 		if not "OK" in res:
 			res["OK"] = 0
@@ -187,14 +259,10 @@ class StatsWindow(QMainWindow):
 		if k == StatKind.Tot:
 			v = sum(yok)
 			title = f"{v:.0f} " + title
-		plot = PieWidget(["OK", "Neut", "KO"],
-			[res["OK"], res["Neutral"], res["KO"]],
-			title,
-			colors=["green", "grey", "red"])
-		return plot
+		return [res["OK"], res["Neutral"], res["KO"]], title
 
 	def mktodayokpie(self, k, u, p, flt=Filter.thisday, factor=1, nb=None):
-		plot = StatsWindow.todayokpie(self.rb, k, u, p, flt, nb)
+		plot = StatsWindow.todayokpie(self.rb, k, u, p, flt, nb, self.stats(flt))
 		plot.setFixedSize(int(self.plotxsize*factor),int(self.plotysize*factor))
 		plot.setFixedSize(int(self.plotxsize*factor),int(self.plotysize*factor))
 		return plot
@@ -234,8 +302,7 @@ class StatsWindow(QMainWindow):
 			return fn(k, self.unit, p, perhour)
 
 	def mktots(self, playout):
-		trades = self.rb.filteredtrades or self.rb.trades
-		t = StatTotals(self.rb.account, trades, self.unit)
+		t = self.grouped("result").totals(self.rb.account, self.unit)
 		ln1 = f"account {t.account}"
 		if self.unit in [StatUnit.Euros]:
 			ln1 += f" return {t.pcent:.0f}%"
@@ -252,6 +319,16 @@ class StatsWindow(QMainWindow):
 			playout.addWidget(lbl)
 
 	def mkstats(self):
+		if self.rb.filteredtrades is None:
+			# stats are for all trades, not only those loaded
+			self.rb.needtrades()
+		# one pass over the trades for every chart; Success graphs
+		# use Failure too, and result pies use Pts for both.
+		units = self.unit | StatUnit.Pts | StatUnit.Success | StatUnit.Failure
+		self.units = units
+		# built when charts over time need it, see stats()
+		self.engine = None
+		self.slice = self.mkslice()
 		x = QWidget()
 		playout = QVBoxLayout(x)
 		self.mktots(playout)
@@ -346,18 +423,19 @@ class TodayPanel(QWidget):
 	def __init__(self, rb):
 		super(TodayPanel, self).__init__()
 		self.rb = rb
+		self.pies = []
 		layout = QVBoxLayout(self)
 		if self.rb is None:
 			return
-		k = StatKind.Tot
-		u = StatUnit.Euros
-		p = StatPlot.DayResult
-		flt = Filter.thisday
-		w = StatsWindow.todayokpie(self.rb, k, u, p, flt)
-		w.setFixedSize(300, 200)
-		layout.addWidget(w)
-
-		k = StatKind.Cnt
-		w = StatsWindow.todayokpie(self.rb, k, u, p, flt)
-		w.setFixedSize(300, 200)
-		layout.addWidget(w)
+		for k in (StatKind.Tot, StatKind.Cnt):
+			w = StatsWindow.todayokpie(self.rb, k, StatUnit.Euros, StatPlot.DayResult)
+			w.setFixedSize(300, 200)
+			layout.addWidget(w)
+			self.pies.append((k, w))
+
+	def refresh(self):
+		"""update the pies after trades change"""
+		for k, w in self.pies:
+			vals, title = StatsWindow.todayokvals(self.rb, k, StatUnit.Euros, StatPlot.DayResult)
+			w.set_title(title)
+			w.set_data(["OK", "Neut", "KO"], vals)
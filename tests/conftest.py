@@ -0,0 +1,27 @@
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "tools"))
+
+import pytest
+from mkroadbook import mkroadbook
+from data import RoadBook
+
+NTRADES = 400
+
+
+@pytest.fixture
+def rbdir(tmp_path) -> str:
+	"""directory with a synthetic roadbook"""
+	path = str(tmp_path / "rb")
+	mkroadbook(path, NTRADES)
+	return path
+
+
+@pytest.fixture
+def rb(rbdir) -> RoadBook:
+	rb = RoadBook()
+	assert rb.load(rbdir) == []
+	return rb
@@ -0,0 +1,35 @@
+import os
+import shutil
+
+import pytest
+from data import *
+
+
+def test_archive(rb, tmp_path):
+	with pytest.raises(ValueError):
+		rb.archive(rb.tradespath())
+	with pytest.raises(ValueError):
+		rb.archive(os.path.join(rb.dir, ".", TRADESFILE + BCK))
+	p = str(tmp_path / "old.csv")
+	shutil.copyfile(rb.tradespath(), p)
+	a = rb.archive(p)
+	assert len(a) == len(rb.trades)
+	t = rb.trades[7]
+	assert a[a.find(t.trade)].datein == t.datein
+	a.close()
+
+
+def test_noseparator(rb, tmp_path):
+	p = str(tmp_path / "old.csv")
+	with open(rb.tradespath(), "rb") as f:
+		lines = f.read().splitlines(keepends=True)
+	# records with no separator, in the middle and last
+	lines[3] = b"12345\n"
+	lines.append(b"777")
+	with open(p, "wb") as f:
+		f.write(b"".join(lines))
+	a = rb.archive(p)
+	assert a.ids[2] == 12345
+	assert a.ids[-1] == 777
+	assert a.find(12345) == 2
+	a.close()
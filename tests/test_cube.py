@@ -0,0 +1,66 @@
+from stats import *
+
+ALLUNITS = StatUnit(0)
+for u in StatUnit:
+	ALLUNITS |= u
+
+
+def filters(rb) -> list[Filter]:
+	setups = rb.setupNames()
+	instrs = rb.instrumentNames()
+	return [
+		Filter(),
+		Filter(setups=set(setups[:2])),
+		Filter(instruments=set(instrs[:3]), hours={9, 10, 11}),
+		Filter(wdays={WDay.Mon, WDay.Tue}, results={Result.OK}),
+		Filter(dirs={Dir.Long}, since=date(2022, 1, 15), until=date(2022, 3, 10)),
+		Filter(since=date(2022, 2, 1), until=date(2022, 2, 28)),
+		Filter(since=date(2022, 1, 20), until=date(2022, 1, 25)),
+	]
+
+
+def sametotals(a: StatTotals, b: StatTotals) -> None:
+	va, vb = vars(a), vars(b)
+	for k in va:
+		assert abs(va[k] - vb[k]) < 1e-6, k
+
+
+def sameper(a, b) -> None:
+	assert a[0] == b[0]
+	assert len(a[1]) == len(b[1])
+	for x, y in zip(a[1], b[1]):
+		assert abs(x - y) < 1e-6
+
+
+def test_slice(rb):
+	cube = cubefor(rb)
+	for flt in filters(rb):
+		s = cube.slice(flt)
+		e = StatsEngine(flt.apply(rb.trades), ALLUNITS)
+		for u in StatUnit:
+			sametotals(s.totals(rb.account, u), e.totals(rb.account, u))
+			for k in StatKind:
+				for key in ("setup", "instrument", "hour", "wday", "result", "month"):
+					sameper(s.per(key, u, k, 10), e.per(key, u, k, 10))
+
+
+def test_slice_after_edit(rb):
+	flt = Filter(setups=set(rb.setupNames()[:2]))
+	rb.filteredtrades = rb.filter(flt)
+	assert rb.lastfiltered(rb.filteredtrades) is flt
+	cubefor(rb)
+	# one trade leaves the filter, another one changes its value
+	t = rb.filteredtrades[0]
+	t.setup = rb.setupNames()[2]
+	t.inval()
+	rb.adduses(t)
+	t = rb.filteredtrades[1]
+	t.euros += 1000
+	t.inval()
+	rb.adduses(t)
+	# the list shown no longer matches the filter
+	assert rb.lastfiltered(rb.filteredtrades) is None
+	s = cubefor(rb).slice(flt)
+	e = StatsEngine(flt.apply(rb.trades), ALLUNITS)
+	for u in StatUnit:
+		sametotals(s.totals(rb.account, u), e.totals(rb.account, u))
@@ -0,0 +1,46 @@
+import pytest
+
+import stats
+from stats import *
+from test_cube import ALLUNITS, sametotals, sameper
+
+
+@pytest.fixture(params=["numpy", "python"])
+def usenp(request, monkeypatch) -> None:
+	"""run with and without numpy in stats"""
+	if request.param == "numpy":
+		pytest.importorskip("numpy")
+	else:
+		monkeypatch.setattr(stats, "np", None)
+
+
+def oldper(ts, fn, key, u, k, nb):
+	"""what the StatsEngine replaces"""
+	if fn in (perday, permonth):
+		return perfunc(ts, u, k, ORDEREDKEYS[key], nb)
+	if fn is perweek:
+		return fn(ts, u, k, nb)
+	return perfield(ts, u, k, FIELDKEYS[key])
+
+
+def test_engine(rb, usenp):
+	ts = rb.trades
+	e = StatsEngine(ts, ALLUNITS)
+	for u in StatUnit:
+		sametotals(e.totals(rb.account, u), StatTotals(rb.account, ts, u))
+		sameper(("", e.tradevaluetots(u)), ("", tradevaluetots(ts, u)))
+		for k in StatKind:
+			for fn, key in PERKEYS.items():
+				for nb in (None, 10):
+					sameper(e.perfn(fn, u, k, nb), oldper(ts, fn, key, u, k, nb))
+
+
+def test_last(rb, usenp):
+	e = StatsEngine(rb.trades, ALLUNITS)
+	for f in (Filter.thisweek, Filter.thismonth, Filter.thisyear):
+		ts = f(rb.trades)
+		le = e.last(len(ts))
+		for u in StatUnit:
+			sametotals(le.totals(rb.account, u), StatTotals(rb.account, ts, u))
+			for k in StatKind:
+				sameper(le.per("result", u, k), perresult(ts, u, k))
@@ -0,0 +1,52 @@
+from copy import copy
+
+from data import *
+from stats import *
+
+
+class Engines:
+	"""engines kept by trades generation, as StatsWindow.mkengine does"""
+	def __init__(self, rb):
+		self.rb = rb
+		self.engines = {}
+
+	def get(self) -> StatsEngine:
+		key = self.rb.generation
+		if key not in self.engines:
+			self.engines[key] = StatsEngine(self.rb.trades, StatUnit.Euros)
+		return self.engines[key]
+
+	def check(self) -> None:
+		rb = self.rb
+		got = self.get().totals(rb.account, StatUnit.Euros)
+		want = StatTotals(rb.account, rb.trades, StatUnit.Euros)
+		assert got.ntrades == want.ntrades
+		assert abs(got.total - want.total) < 1e-6
+
+
+def test_added(rb):
+	e = Engines(rb)
+	e.check()
+	t = copy(rb.trades[10])
+	t.trade = rb.nextId()
+	t.euros = 500.0
+	# as the trades table does: defaults, row, then its own insert
+	rb.defaultsfortrade(t)
+	e.check()
+	rb.trades.insert(rb.rowfortrade(t), t)
+	e.check()
+	t = copy(t)
+	t.trade = rb.nextId()
+	rb.addtrade(t)
+	e.check()
+
+
+def test_moved(rb):
+	e = Engines(rb)
+	before = e.get().tradevaluetots(StatUnit.Euros)
+	t = rb.trades[0]
+	t.datein = rb.trades[-1].datein
+	assert rb.movetrade(t)
+	assert rb.trades[-1] is t
+	assert e.get().tradevaluetots(StatUnit.Euros) != before
+	assert e.get().tradevaluetots(StatUnit.Euros) == tradevaluetots(rb.trades, StatUnit.Euros)
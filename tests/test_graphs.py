@@ -0,0 +1,18 @@
+import os
+
+from data import *
+
+
+def test_foundgraphs(rb):
+	d = os.path.join(rb.dir, GRAPHSDIR)
+	for name in ("trade5es.png", "trade5es.2.png", "trade6es.1.png", "trade7es.0.png"):
+		open(os.path.join(d, name), "wb").close()
+	es = Trade(trade=5, instrument="ES")
+	es1 = Trade(trade=6, instrument="ES.1")
+	assert rb.foundgraphs(es) == [rb.mkgraphpath(es), rb.mkgraphpath(es, 2)]
+	assert rb.foundgraphs(es1) == [rb.mkgraphpath(es1)]
+	assert rb.foundgraphs(Trade(trade=7, instrument="ES")) == []
+	p = rb.mkgraphpath(es1, 1)
+	open(p, "wb").close()
+	rb.addedgraph(p)
+	assert rb.foundgraphs(es1) == [rb.mkgraphpath(es1), p]
@@ -0,0 +1,32 @@
+import os
+from copy import copy
+
+from data import *
+
+
+def test_deleted(rb, rbdir):
+	n = len(rb.trades)
+	# a trade that is not there
+	t = copy(rb.trades[0])
+	t.trade = rb.nextId() + 100
+	TradeJournal(rb.journalpath()).append(JDEL, t)
+	rb = RoadBook()
+	assert rb.load(rbdir) == []
+	assert len(rb.trades) == n
+	assert TRADESFILE in rb.dirties
+	rb.save()
+	assert not os.path.exists(rb.journalpath())
+	rb = RoadBook()
+	assert rb.load(rbdir) == []
+	assert rb.loadtimes == {}
+
+
+def test_replay(rb, rbdir):
+	t = rb.trades[3]
+	t.notes = "journaled"
+	rb.logtrade(JPUT, t)
+	rb = RoadBook()
+	assert rb.load(rbdir) == []
+	assert rb.loadedtrade(t).notes == "journaled"
+	rb.save()
+	assert not os.path.exists(rb.journalpath())
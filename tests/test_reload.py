@@ -0,0 +1,27 @@
+from data import *
+
+
+def test_loadedtrade(rb, rbdir):
+	sel = rb.trades[5]
+	other = RoadBook()
+	assert other.load(rbdir) == []
+	other.trades[5].notes = "edited elsewhere"
+	other.deltrade(other.trades[9])
+	other.dirtied(TRADESFILE)
+	other.save()
+	gone = rb.trades[9]
+	assert rb.reloadtable(TRADESFILE) == []
+	assert all(t is not sel for t in rb.trades)
+	t = rb.loadedtrade(sel)
+	assert t.trade == sel.trade and t.notes == "edited elsewhere"
+	assert rb.loadedtrade(t) is t
+	assert rb.loadedtrade(gone) is None
+	# a feature edit, as the data window does it
+	t.has = internset({"newfeat"})
+	t.inval()
+	rb.adduses(t)
+	rb.dirtied(TRADESFILE)
+	rb.save()
+	rb = RoadBook()
+	assert rb.load(rbdir) == []
+	assert "newfeat" in rb.loadedtrade(t).has
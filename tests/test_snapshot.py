@@ -0,0 +1,48 @@
+import os
+
+from data import *
+
+
+def test_snapshot(rb, rbdir):
+	assert os.path.exists(rb.snapshotpath())
+	rb = RoadBook()
+	assert rb.load(rbdir) == []
+	assert rb.loadtimes == {}
+	with open(rb.setupspath(), "a") as f:
+		f.write('"NEWSET";"x"\n')
+	rb = RoadBook()
+	assert rb.load(rbdir) == []
+	assert rb.loadtimes != {}
+	assert rb.findSetup("NEWSET") is not None
+
+
+def test_partitions(rb):
+	rb.usepartitions(True)
+	assert not os.path.exists(rb.snapshotpath())
+	rb.save()
+	assert not os.path.exists(rb.snapshotpath())
+
+
+def test_samestat(rb, rbdir):
+	# rewritten keeping size and mtime, as sync tools may do
+	p = rb.setupspath()
+	st = os.stat(p)
+	with open(p, "rb") as f:
+		data = f.read()
+	n = rb.setups[0].setup
+	m = n[:-1] + ("X" if n[-1] != "X" else "Y")
+	with open(p, "wb") as f:
+		f.write(data.replace(n.encode(), m.encode()))
+	os.utime(p, ns=(st.st_atime_ns, st.st_mtime_ns))
+	assert os.stat(p).st_size == st.st_size
+	rb = RoadBook()
+	rb.load(rbdir)
+	assert rb.findSetup(m) is not None
+
+
+def test_foreign(rb, rbdir):
+	with open(rb.snapshotpath(), "wb") as f:
+		f.write(b"not a snapshot")
+	rb = RoadBook()
+	assert rb.load(rbdir) == []
+	assert rb.loadtimes != {}
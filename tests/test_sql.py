@@ -0,0 +1,94 @@
+import os
+from dataclasses import astuple
+
+import pytest
+from data import *
+from stats import *
+from test_cube import ALLUNITS, filters, sameper
+
+
+def tosql(rbdir) -> None:
+	rb = RoadBook()
+	assert rb.load(rbdir) == []
+	rb.tosql()
+
+
+def test_filter(rbdir):
+	tosql(rbdir)
+	rb = RoadBook()
+	assert rb.load(rbdir) == []
+	assert rb.sqlclean()
+	for flt in filters(rb):
+		assert rb.filter(flt) == flt.apply(rb.trades)
+
+
+def test_badrow(rbdir):
+	tosql(rbdir)
+	db = SqlBook(os.path.join(rbdir, SQLFILE))
+	with db.db:
+		db.db.execute("UPDATE trades SET datein = 'bad' WHERE row = 5")
+	db.close()
+	rb = RoadBook()
+	errs = rb.load(rbdir)
+	assert len(errs) == 1
+	rb.dirties = set()
+	assert rb.sqlclean()
+	for flt in filters(rb):
+		assert rb.filter(flt) == flt.apply(rb.trades)
+
+
+def test_groups(rbdir):
+	tosql(rbdir)
+	rb = RoadBook()
+	assert rb.load(rbdir) == []
+	for flt in filters(rb):
+		ts = rb.filter(flt)
+		want = {}
+		for t in ts:
+			n, tot = want.get(t.setup, (0, 0.0))
+			want[t.setup] = (n+1, tot+t.out)
+		got = rb.sqlgroups(ts, "setup", "Pts")
+		assert [k for k, _, _ in got] == list(want)
+		for k, tot, n in got:
+			assert n == want[k][0]
+			assert abs(tot - want[k][1]) < 1e-6
+	assert rb.sqlgroups(ts[1:], "setup", "Pts") is None
+
+
+def test_tocsv(rbdir):
+	rb = RoadBook()
+	assert rb.load(rbdir) == []
+	trades = [astuple(t) for t in rb.trades]
+	rb.tosql()
+	rb.tocsv()
+	assert not os.path.exists(rb.sqlpath())
+	rb = RoadBook()
+	assert rb.load(rbdir) == []
+	assert rb.db is None
+	assert [astuple(t) for t in rb.trades] == trades
+
+
+def test_sqlstats(rbdir):
+	tosql(rbdir)
+	rb = RoadBook()
+	assert rb.load(rbdir) == []
+	for flt in filters(rb):
+		ts = rb.filter(flt)
+		e = StatsEngine(ts, ALLUNITS)
+		s = SqlStats(ts, lambda: e)
+		for u in StatUnit:
+			for k in StatKind:
+				for key in PERKEYS.values():
+					assert sqlper(ts, key, u, k) is not None or key == "week"
+					sameper(s.per(key, u, k), e.per(key, u, k))
+					sameper(s.per(key, u, k, 10), e.per(key, u, k, 10))
+
+
+def test_noaccount(rbdir):
+	tosql(rbdir)
+	db = SqlBook(os.path.join(rbdir, SQLFILE))
+	with db.db:
+		db.db.execute("DELETE FROM account")
+	db.close()
+	with pytest.raises(ValueError):
+		RoadBook().load(rbdir)
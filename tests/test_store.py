@@ -0,0 +1,19 @@
+from data import *
+from test_cube import filters
+
+
+def test_select(rb):
+	rb.usestore()
+	for flt in filters(rb):
+		assert rb.filter(flt) == flt.apply(rb.trades)
+
+
+def test_moved(rb):
+	rb.usestore()
+	# the first row in the store, moved within a later date
+	for t in (rb.trades[0], rb.trades[1]):
+		t.datein = rb.trades[-10].datein
+		rb.adduses(t)
+		assert movetrade(rb.trades, t)
+	for flt in filters(rb):
+		assert rb.filter(flt) == flt.apply(rb.trades)
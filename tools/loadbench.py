@@ -0,0 +1,50 @@
+#
+# time to load trades and to parse dates:
+#	python tools/loadbench.py [-src dir] roadbook [runs]
+# Times load_objects_from_csv for the trades file and a whole
+# RoadBook.load, and parsing 100k d/m/Y dates with strptime and
+# with a column parser. -src is as for trademem.py.
+#
+import os
+import sys
+from datetime import datetime, date, timedelta
+from time import perf_counter
+
+src = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+args = sys.argv[1:]
+if len(args) > 1 and args[0] == "-src":
+	src = args[1]
+	args = args[2:]
+if len(args) not in (1, 2):
+	print("usage: loadbench.py [-src dir] roadbook [runs]", file=sys.stderr)
+	sys.exit(2)
+sys.path.insert(0, src)
+from data import *
+import csv_mapper
+
+path = args[0]
+runs = int(args[1]) if len(args) > 1 else 3
+renames = {"datein": "date", "has": "with"}
+for _ in range(runs):
+	t0 = perf_counter()
+	ts, errs = csv_mapper.load_objects_from_csv(os.path.join(path, TRADESFILE), Trade, renames)
+	t1 = perf_counter()
+	rb = RoadBook()
+	rb.load(path)
+	t2 = perf_counter()
+	print(f"{len(ts)} trades: decode {t1-t0:.2f}s, load {t2-t1:.2f}s")
+
+d0 = date(2022, 1, 3)
+dates = [(d0 + timedelta(days=i//40)).strftime("%d/%m/%Y") for i in range(100000)]
+t0 = perf_counter()
+for s in dates:
+	datetime.strptime(s, "%d/%m/%Y").date()
+t1 = perf_counter()
+print(f"100k d/m/Y dates: strptime {t1-t0:.2f}s")
+if hasattr(csv_mapper, "date_parser"):
+	parse = csv_mapper.date_parser()
+	t0 = perf_counter()
+	for s in dates:
+		parse(s)
+	t1 = perf_counter()
+	print(f"100k d/m/Y dates: column parser {t1-t0:.2f}s")
@@ -0,0 +1,47 @@
+#
+# synthetic roadbook for measurements and tests:
+#	python tools/mkroadbook.py dir [ntrades [seed]]
+# Trades are 4 a day from 2022-01-03, with random instruments,
+# setups, hours, results, 2 features and a graph path each.
+# Revisions before trades could go without graphs load them too.
+#
+import os
+import random
+import shutil
+import sys
+from datetime import date, time, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from data import *
+
+
+def mkroadbook(path: str, n: int = 2000, seed: int = 1) -> RoadBook:
+	if os.path.exists(path):
+		shutil.rmtree(path)
+	RoadBook.mknew(path)
+	rb = RoadBook()
+	rb.load(path)
+	rnd = random.Random(seed)
+	instrs = rb.instrumentNames()
+	setups = rb.setupNames()
+	feats = rb.featureNames()
+	d0 = date(2022, 1, 3)
+	for i in range(n):
+		t = Trade(i+2, rnd.choice(instrs), rnd.choice(setups),
+			d0 + timedelta(days=i//4), rnd.choice([Dir.Long, Dir.Short]),
+			1.0, time(9+rnd.randint(0, 8), 5), time(17, 30), 10, 5,
+			rnd.uniform(-30, 30), 0.0 if i%3 else rnd.uniform(-50, 50),
+			[f"/tmp/rbgraphs/trade{i+2}.png"], "", set(rnd.sample(feats, 2)))
+		rb.addtrade(t)
+	rb.defaultsfortrades()
+	rb.save()
+	return rb
+
+
+if __name__ == "__main__":
+	if len(sys.argv) < 2:
+		print("usage: mkroadbook.py dir [ntrades [seed]]", file=sys.stderr)
+		sys.exit(2)
+	n = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+	seed = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+	mkroadbook(sys.argv[1], n, seed)
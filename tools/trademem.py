@@ -0,0 +1,41 @@
+#
+# bytes per trade loaded, measured with tracemalloc:
+#	python tools/trademem.py [-src dir] roadbook
+# -src imports the rb sources from dir instead, e.g. a
+# git worktree of an older revision, to compare with it.
+#
+import gc
+import os
+import sys
+import tracemalloc
+
+src = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+args = sys.argv[1:]
+if len(args) > 1 and args[0] == "-src":
+	src = args[1]
+	args = args[2:]
+if len(args) != 1:
+	print("usage: trademem.py [-src dir] roadbook", file=sys.stderr)
+	sys.exit(2)
+sys.path.insert(0, src)
+from data import *
+import csv_mapper
+
+rb = RoadBook()
+rb.load(args[0])
+renames = {"datein": "date", "has": "with"}
+del rb.trades[:]
+rb.defaultsfortrades()
+gc.collect()
+tracemalloc.start()
+ts, errs = csv_mapper.load_objects_from_csv(rb.tradespath(), Trade, renames)
+gc.collect()
+loaded, _ = tracemalloc.get_traced_memory()
+rb.trades = ts
+for t in ts:
+	rb.defaultsfortrade(t)
+gc.collect()
+used, _ = tracemalloc.get_traced_memory()
+print(f"{len(ts)} trades, {len(errs)} errors")
+print(f"loaded: {loaded // max(len(ts), 1)} bytes per trade")
+print(f"with defaults and uses: {used // max(len(ts), 1)} bytes per trade")